@@ -1,19 +1,27 @@
 # chatgpt_generate.py
-# (Team -> Athlete aware; 1 RPM + ~70s padding; 3-min cooldown after every 5 successes)
+# (Team -> Athlete aware; concurrent athletes under an RPM cap; 3-min cooldown after every 5 successes)
 
+import argparse
+import asyncio
+import json
 import os
 import time
 import csv
 import base64
+import hashlib
+import io
 import mimetypes
 import random
-from collections import deque
+import ssl
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Optional, Tuple
 
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 # Try to import granular exception types (works with openai>=1.0)
 try:
@@ -21,6 +29,11 @@ try:
 except Exception:  # graceful fallback if symbols not present
     RateLimitError = APIError = APIConnectionError = APITimeoutError = Exception
 
+try:
+    from PIL import Image  # optional: shrink charts before upload
+except ImportError:
+    Image = None
+
 
 # ===================== CONFIG =====================
 BASE_DIR = Path(r"D:\Vald Data")  # Root folder with TEAM subfolders
@@ -28,13 +41,25 @@ MODEL = "gpt-4o-mini"  # Vision model
 TEMPERATURE = 0.3
 MAX_RETRIES = 5  # allow more retries
 BACKOFF_BASE = 8  # seconds (base for exponential backoff)
-RATE_LIMIT_RPM = 1  # <= 1 request per minute
-SAFE_PACE_SECONDS = 70  # ~70s padding between successful calls
+_BACKOFF = [BACKOFF_BASE << i for i in range(MAX_RETRIES)]  # 8, 16, 32, ... per attempt
+RATE_LIMIT_RPM = float(os.getenv("OPENAI_RPM", "1") or "1")  # token refill rate (account tier)
+BUCKET_CAPACITY = float(os.getenv("OPENAI_BURST", "1") or "1")  # requests allowed back-to-back
+CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "8") or "8")  # athletes in flight at once
+ENCODE_WORKERS = 8  # threads reading + base64-encoding images
+PREFETCH_AHEAD = 2  # athletes whose images are encoded while the API slots are busy
 BATCH_SUCCESS_SIZE = 5  # cooldown trigger size
 BATCH_COOLDOWN_SECONDS = 180  # 3 minutes
 
 LOG_CSV = BASE_DIR / "run_log.csv"
 FAILED_LIST = BASE_DIR / "failed.txt"
+B64_CACHE_DIR = BASE_DIR / ".b64cache"  # encoded images reused across runs (safe to delete)
+COMPRESS_BEFORE_UPLOAD = True  # downscale + JPEG-encode images (needs Pillow; else raw upload)
+UPLOAD_MAX_DIM = 1024  # px, longest side after downscale
+UPLOAD_JPEG_QUALITY = 80
+RESP_CACHE_DIR = BASE_DIR / ".respcache"  # model answers keyed by prompt + images (safe to delete)
+BATCH_DIR = BASE_DIR / ".batch"  # --batch mode: JSONL request files + downloaded results
+BATCH_MAX_FILE_BYTES = 190 * 1024 * 1024  # Batch API input files are capped at 200 MB
+BATCH_POLL_SECONDS = 60
 SKIP_IF_MARKDOWN_EXISTS = True  # skip athlete if Analysis.md exists
 FORCE = False  # set True to overwrite Analysis.md
 
@@ -48,25 +73,110 @@ API_KEY = os.getenv("OPENAI_API_KEY")
 if not API_KEY:
     raise RuntimeError("OPENAI_API_KEY not set in environment (.env).")
 
-client = OpenAI(api_key=API_KEY)
+# One pooled HTTP client for the whole run: keep-alive connections skip a TLS handshake per request
+_SSL_CTX = ssl.create_default_context()
+_HTTPX = httpx.AsyncClient(
+    verify=_SSL_CTX,
+    limits=httpx.Limits(
+        max_keepalive_connections=max(32, CONCURRENCY),
+        max_connections=max(32, CONCURRENCY),
+    ),
+    timeout=httpx.Timeout(1800.0),
+)
+client = AsyncOpenAI(api_key=API_KEY, http_client=_HTTPX)
+ENCODE_POOL = ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix="b64")
 
 
 # ===================== HELPERS =====================
+_MIME_BY_SUFFIX = {}  # suffix -> mime (only a handful of extensions ever show up)
+B64_CHUNK = 3 * 64 * 1024  # multiple of 3 -> each chunk encodes independently (no padding mid-stream)
+
+
+def _mime_for(path: Path) -> str:
+    suffix = path.suffix.lower()
+    mime = _MIME_BY_SUFFIX.get(suffix)
+    if mime is None:
+        mime = mimetypes.guess_type(str(path))[0] or "image/png"
+        _MIME_BY_SUFFIX[suffix] = mime
+    return mime
+
+
+def _b64_cache_file(path: Path) -> Path:
+    key = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()
+    return B64_CACHE_DIR / f"{key}.b64"
+
+
+def _compressed_jpeg(path: Path) -> bytes:
+    with Image.open(path) as im:
+        im.thumbnail((UPLOAD_MAX_DIM, UPLOAD_MAX_DIM), Image.LANCZOS)
+        out = io.BytesIO()
+        im.convert("RGB").save(
+            out, "JPEG", quality=UPLOAD_JPEG_QUALITY, optimize=True
+        )
+    return out.getvalue()
+
+
+def _upload_mode() -> str:
+    """How images go into the request: the compression settings, or "raw"."""
+    if COMPRESS_BEFORE_UPLOAD and Image is not None:
+        return f"jpeg{UPLOAD_MAX_DIM}q{UPLOAD_JPEG_QUALITY}"
+    return "raw"
+
+
 def b64_data_url(path: Path) -> str:
-    mime, _ = mimetypes.guess_type(str(path))
-    if not mime:
-        mime = "image/png"
-    with path.open("rb") as f:
-        b = base64.b64encode(f.read()).decode("utf-8")
-    return f"data:{mime};base64,{b}"
+    # Cache entry = "<mtime_ns> <size> <mode>\n<data url>"; a changed image (or setting) simply misses
+    mode = _upload_mode()
+    compress = mode != "raw"
+    st = path.stat()
+    stamp = f"{st.st_mtime_ns} {st.st_size} {mode}"
+    cache_file = _b64_cache_file(path)
+    try:
+        with cache_file.open("r", encoding="ascii") as f:
+            if f.readline().rstrip("\n") == stamp:
+                return f.read()
+    except Exception:
+        pass
+
+    url = None
+    if compress:
+        try:
+            data = base64.b64encode(_compressed_jpeg(path)).decode("ascii")
+            url = f"data:image/jpeg;base64,{data}"
+        except Exception as e:
+            print(f"[WARN] Could not compress {path.name} ({e}); uploading original.")
+    if url is None:
+        # Encode in chunks so we never hold the raw file and its encoding side by side
+        buf = bytearray()
+        with path.open("rb", buffering=1 << 20) as f:
+            while chunk := f.read(B64_CHUNK):
+                buf.extend(base64.b64encode(chunk))
+        url = f"data:{_mime_for(path)};base64,{buf.decode('ascii')}"
+
+    try:
+        B64_CACHE_DIR.mkdir(exist_ok=True)
+        tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with tmp.open("w", encoding="ascii") as f:
+            f.write(stamp + "\n")
+            f.write(url)
+        os.replace(tmp, cache_file)
+    except Exception:
+        pass
+    return url
+
+
+def _is_image_entry(e: os.DirEntry) -> bool:
+    return (
+        os.path.splitext(e.name)[1].lower() in VALID_IMAGE_EXTS
+        and e.is_file()
+    )
 
 
 def list_images(folder: Path) -> List[Path]:
-    imgs = []
-    for p in sorted(folder.iterdir(), key=lambda x: x.name.lower()):
-        if p.suffix.lower() in VALID_IMAGE_EXTS:
-            imgs.append(p)
-    return imgs
+    # scandir hands back cached type info -> no extra stat / Path per entry
+    with os.scandir(folder) as it:
+        names = [e.name for e in it if _is_image_entry(e)]
+    names.sort(key=str.lower)
+    return [folder / n for n in names]
 
 
 def gather_team_athletes(root: Path) -> List[Tuple[str, Path]]:
@@ -77,38 +187,46 @@ def gather_team_athletes(root: Path) -> List[Tuple[str, Path]]:
     Back-compat: if athlete dirs live directly under root, treat team as "".
     """
     pairs: List[Tuple[str, Path]] = []
+    direct_athletes: List[Path] = []
 
-    # First: Team -> Athlete
-    for team_dir in sorted(
-        [p for p in root.iterdir() if p.is_dir()], key=lambda x: x.name.lower()
-    ):
-        # Heuristic: if team_dir contains image files directly, it's probably an athlete folder (old layout)
-        # We'll collect real teams as those that have at least one subdirectory.
-        subdirs = [c for c in team_dir.iterdir() if c.is_dir()]
-        if subdirs:
-            for athlete_dir in sorted(subdirs, key=lambda x: x.name.lower()):
-                pairs.append((team_dir.name, athlete_dir))
-
-    # Back-compat: athletes directly under base (no team)
-    # Only include folders that contain at least one image so we don't double-count teams above.
-    direct_athletes = [
-        p
-        for p in BASE_DIR.iterdir()
-        if p.is_dir()
-        and any(
-            (p / f).is_file() and (p / f).suffix.lower() in VALID_IMAGE_EXTS
-            for f in os.listdir(p)
+    # Dot-folders are this script's own caches (.b64cache, .respcache, .batch), never teams
+    with os.scandir(root) as it:
+        top = sorted(
+            (e for e in it if e.is_dir() and not e.name.startswith(".")),
+            key=lambda e: e.name.lower(),
         )
-    ]
-    for a in sorted(direct_athletes, key=lambda x: x.name.lower()):
-        pairs.append(("", a))
+
+    # One scandir per top-level folder decides what it is:
+    #   has subdirectories -> Team -> Athlete
+    #   elif has images directly -> athlete directly under base (back-compat, team "")
+    for team_entry in top:
+        subdirs: List[str] = []
+        has_images = False
+        try:
+            with os.scandir(team_entry.path) as it:
+                for e in it:
+                    if e.is_dir():
+                        if not e.name.startswith("."):
+                            subdirs.append(e.name)
+                    elif not has_images and _is_image_entry(e):
+                        has_images = True
+        except OSError:
+            continue
+        team_dir = root / team_entry.name
+        if subdirs:
+            for name in sorted(subdirs, key=str.lower):
+                pairs.append((team_entry.name, team_dir / name))
+        elif has_images:
+            direct_athletes.append(team_dir)
+
+    # `top` is already sorted, so direct athletes come out in name order
+    pairs.extend(("", a) for a in direct_athletes)
 
     return pairs
 
 
-def build_prompt(athlete_name: str) -> str:
-    # Same structure (unchanged), the images are provided separately
-    return f"""These are the performance data of {athlete_name} who is 11–16 years
+# Same structure (unchanged), the images are provided separately
+_PROMPT_TEMPLATE = """These are the performance data of <<ATHLETE>> who is 11–16 years
 old female. Here are 5-0-5 Drill, 20 YD Sprint, Lunges, Overhead
 Squat, Nordic & Countermovement Jump. Analyze them carefully.
 Act as a Physical Coach. Extract the data, analyze them and give me
@@ -214,11 +332,16 @@ style in the memory as Short Format Style.
 """
 
 
+def build_prompt(athlete_name: str) -> str:
+    return _PROMPT_TEMPLATE.replace("<<ATHLETE>>", athlete_name)
+
+
 def build_user_content(prompt_text: str, image_paths: List[Path]):
     # One "user" message containing the text and all images as data URLs
     content = [{"type": "text", "text": prompt_text}]
-    for p in image_paths:
-        content.append({"type": "image_url", "image_url": {"url": b64_data_url(p)}})
+    # Disk reads + encodes overlap across the pool; map keeps the image order
+    for url in ENCODE_POOL.map(b64_data_url, image_paths):
+        content.append({"type": "image_url", "image_url": {"url": url}})
     return content
 
 
@@ -232,49 +355,88 @@ def ensure_log_files():
         FAILED_LIST.write_text("", encoding="utf-8")
 
 
-def append_log(
-    athlete: str, status: str, started: float, finished: float, notes: str = ""
-):
-    with LOG_CSV.open("a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow([athlete, status, int(started), int(finished), notes])
+class LogSink:
+    """Long-lived buffered handles for run_log.csv / failed.txt (flushed once per athlete)."""
 
+    def __init__(self):
+        ensure_log_files()
+        self.csv_fh = LOG_CSV.open("a", newline="", encoding="utf-8", buffering=1 << 16)
+        self.csv_w = csv.writer(self.csv_fh)
+        self.fail_fh = FAILED_LIST.open("a", encoding="utf-8", buffering=1 << 16)
 
-def append_failure(athlete: str, reason: str):
-    with FAILED_LIST.open("a", encoding="utf-8") as f:
-        f.write(f"{athlete}\t{reason}\n")
+    def flush(self):
+        self.csv_fh.flush()
+        self.fail_fh.flush()
 
+    def close(self):
+        for fh in (self.csv_fh, self.fail_fh):
+            try:
+                fh.close()
+            except Exception:
+                pass
 
-@dataclass
-class RateLimiter:
-    rpm: int
-    window: int = 60
 
-    def __post_init__(self):
-        self.calls = deque()
+sink: Optional[LogSink] = None  # opened by run_all()
 
-    def wait_for_slot(self):
-        now = time.time()
-        # Purge old calls outside window
-        while self.calls and now - self.calls[0] > self.window:
-            self.calls.popleft()
-        # If at capacity, sleep until slot frees
-        if len(self.calls) >= self.rpm:
-            to_sleep = self.window - (now - self.calls[0]) + 0.5
-            if to_sleep > 0:
-                time.sleep(to_sleep)
 
-    def mark(self):
-        self.calls.append(time.time())
+def append_log(
+    athlete: str, status: str, started: float, finished: float, notes: str = ""
+):
+    sink.csv_w.writerow([athlete, status, int(started), int(finished), notes])
 
 
-rl = RateLimiter(RATE_LIMIT_RPM)
-ensure_log_files()
+def append_failure(athlete: str, reason: str):
+    sink.fail_fh.write(f"{athlete}\t{reason}\n")
 
 
-def call_with_retries(model: str, content):
+class TokenBucket:
+    """
+    Token-bucket limiter: refills `rate_per_min` tokens per minute up to `capacity`.
+    A request goes out immediately while tokens remain and otherwise sleeps only for the deficit.
+    """
+
+    def __init__(self, rate_per_min: float, capacity: float):
+        self.rate = max(rate_per_min, 0.01) / 60.0  # tokens per second
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = asyncio.Lock()  # serialises async acquirers -> FIFO-ish dispatch
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def _take(self) -> float:
+        """Consume one token; return how long the caller must wait for it (0 if available)."""
+        self._refill()
+        if self.tokens < 1:
+            deficit = (1 - self.tokens) / self.rate
+            self.tokens = 0.0
+            self.last += deficit  # the token we are waiting for is already spent
+            return deficit
+        self.tokens -= 1
+        return 0.0
+
+    async def acquire_async(self):
+        async with self.lock:
+            wait = self._take()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    async def pause(self, seconds: float):
+        """Hold every new request back for `seconds` (batch cooldown); no tokens accrue meanwhile."""
+        async with self.lock:
+            await asyncio.sleep(seconds)
+            self.last = time.monotonic()
+
+
+rl = TokenBucket(RATE_LIMIT_RPM, BUCKET_CAPACITY)
+
+
+async def call_with_retries(model: str, content):
     """
-    Strict 1 RPM pacing + ~70s extra padding between *successful* calls.
+    Pacing comes from the shared RPM limiter (no fixed sleep after each call).
     Robust 429 handling: exponential backoff with jitter and respect Retry-After when available.
     """
     attempts = 0
@@ -283,22 +445,15 @@ def call_with_retries(model: str, content):
     while attempts < MAX_RETRIES:
         attempts += 1
         try:
-            # Respect RPM cap
-            rl.wait_for_slot()
+            # Respect RPM cap (shared by every in-flight athlete)
+            await rl.acquire_async()
 
-            resp = client.chat.completions.create(
+            resp = await client.chat.completions.create(
                 model=model,
                 messages=[{"role": "user", "content": content}],
                 temperature=TEMPERATURE,
             )
 
-            # mark a successful call against the RPM bucket
-            rl.mark()
-
-            # Gentle extra padding to stay under TPM (token-per-minute) limits
-            jitter = random.uniform(5, 12)  # add small randomness to desync requests
-            time.sleep(SAFE_PACE_SECONDS + jitter)
-
             msg = resp.choices[0].message.content if resp.choices else ""
             if not msg or not msg.strip():
                 raise RuntimeError("Empty completion content.")
@@ -315,26 +470,24 @@ def call_with_retries(model: str, content):
                 )
             except Exception:
                 retry_after = None
-            # base wait: padding + exponential backoff
-            backoff = max(SAFE_PACE_SECONDS + 10, BACKOFF_BASE * (2 ** (attempts - 1)))
+            # base wait: exponential backoff (at least one RPM window)
+            backoff = max(1 / rl.rate, _BACKOFF[attempts - 1])
             sleep_for = max(backoff, retry_after or 0)
-            time.sleep(sleep_for)
+            await asyncio.sleep(sleep_for)
             last_err = e
 
         except (APIConnectionError, APITimeoutError) as e:
             # transient network; exponential backoff with jitter
-            backoff = BACKOFF_BASE * (2 ** (attempts - 1)) + random.uniform(1.0, 4.0)
-            time.sleep(backoff)
+            backoff = _BACKOFF[attempts - 1] + 1.0 + random.random() * 3.0
+            await asyncio.sleep(backoff)
             last_err = e
 
         except APIError as e:
             # Server-side hiccup (5xx) -> backoff; 4xx (besides 429) -> likely unrecoverable
             status = getattr(e, "status_code", None)
             if status and 500 <= int(status) < 600:
-                backoff = BACKOFF_BASE * (2 ** (attempts - 1)) + random.uniform(
-                    1.0, 4.0
-                )
-                time.sleep(backoff)
+                backoff = _BACKOFF[attempts - 1] + 1.0 + random.random() * 3.0
+                await asyncio.sleep(backoff)
                 last_err = e
             else:
                 # Unrecoverable client error (e.g., 400) — don't spin on it
@@ -342,19 +495,16 @@ def call_with_retries(model: str, content):
 
         except Exception as e:
             # Unknown error: try a conservative backoff once or twice
-            backoff = BACKOFF_BASE * (2 ** (attempts - 1)) + random.uniform(1.0, 3.0)
-            time.sleep(backoff)
+            backoff = _BACKOFF[attempts - 1] + 1.0 + random.random() * 2.0
+            await asyncio.sleep(backoff)
             last_err = e
 
     raise RuntimeError(f"API failed after {MAX_RETRIES} attempts: {last_err}")
 
 
 def write_markdown(
-    folder: Path, team: str, athlete: str, images: List[Path], body_md: str
+    out_path: Path, team: str, athlete: str, images: List[Path], body_md: str
 ) -> Path:
-    filename = MARKDOWN_NAME_TEMPLATE.format(athlete=athlete).strip()
-    out_path = folder / filename
-
     header = [
         f"# {athlete} — Short Format Report",
         "",
@@ -372,12 +522,51 @@ def write_markdown(
     return out_path
 
 
-def process_athlete_folder(team: str, folder: Path) -> Optional[Path]:
+def _response_cache_file(prompt_text: str, images: List[Path]) -> Path:
+    # Images are identified by name + mtime + size (cheap; a re-scraped image changes the key)
+    h = hashlib.sha256()
+    # Model + upload settings change the request payload, so they are part of the key
+    h.update(f"{MODEL}\0{TEMPERATURE}\0{_upload_mode()}\0".encode("utf-8"))
+    h.update(prompt_text.encode("utf-8"))
+    for p in images:
+        st = p.stat()
+        h.update(f"\0{p.name}\0{st.st_mtime_ns}\0{st.st_size}".encode("utf-8"))
+    return RESP_CACHE_DIR / f"{h.hexdigest()}.md"
+
+
+def _store_response(cache_file: Path, markdown: str):
+    try:
+        RESP_CACHE_DIR.mkdir(exist_ok=True)
+        tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(markdown, encoding="utf-8")
+        os.replace(tmp, cache_file)
+    except Exception:
+        pass
+
+
+@dataclass
+class AthleteJob:
+    team: str
+    folder: Path
+    athlete: str
+    md_path: Path
+    started: float
+    images: List[Path]
+    prompt_text: str
+    cache_file: Path
+
+
+def prepare_athlete(team: str, folder: Path) -> Tuple[Optional[AthleteJob], Optional[Path]]:
+    """
+    Skip / no-image / response-cache checks shared by the live and --batch paths.
+    Returns (job, None) when the model must be asked, else (None, result) where result
+    is the markdown path (done) or None (failed).
+    """
     athlete = folder.name.strip()
     started = time.time()
 
     # Skip if analysis exists (unless FORCE)
-    md_path = folder / MARKDOWN_NAME_TEMPLATE.format(athlete=athlete).strip()
+    md_path = folder / MARKDOWN_NAME_TEMPLATE.format(athlete=athlete)
     if SKIP_IF_MARKDOWN_EXISTS and not FORCE and md_path.exists():
         append_log(
             athlete,
@@ -386,7 +575,7 @@ def process_athlete_folder(team: str, folder: Path) -> Optional[Path]:
             time.time(),
             f"Analysis.md already exists | Team={team}",
         )
-        return md_path
+        return None, md_path
 
     images = list_images(folder)
     print(
@@ -397,25 +586,73 @@ def process_athlete_folder(team: str, folder: Path) -> Optional[Path]:
             athlete, "no_images", started, time.time(), f"No images found | Team={team}"
         )
         append_failure(athlete, f"No images found | Team={team}")
-        return None
+        return None, None
 
     prompt_text = build_prompt(athlete)
-    user_content = build_user_content(prompt_text, images)
 
-    try:
-        completion_md = call_with_retries(MODEL, user_content)
-        out_path = write_markdown(folder, team, athlete, images, completion_md)
+    # Already answered for exactly this prompt + image set? Don't pay for it twice.
+    # FORCE asks for a fresh answer, so the cache is only written then, never read.
+    cache_file = _response_cache_file(prompt_text, images)
+    cached_md = None
+    if not FORCE:
+        try:
+            cached_md = cache_file.read_text(encoding="utf-8")
+        except Exception:
+            pass
+    if cached_md:
+        out_path = write_markdown(md_path, team, athlete, images, cached_md)
         append_log(
-            athlete, "ok", started, time.time(), f"Saved: {out_path.name} | Team={team}"
+            athlete,
+            "ok_cached",
+            started,
+            time.time(),
+            f"Saved from cache: {out_path.name} | Team={team}",
         )
-        return out_path
+        return None, out_path
+
+    job = AthleteJob(team, folder, athlete, md_path, started, images, prompt_text, cache_file)
+    return job, None
+
+
+def finish_athlete(job: AthleteJob, completion_md: str) -> Path:
+    _store_response(job.cache_file, completion_md)
+    out_path = write_markdown(job.md_path, job.team, job.athlete, job.images, completion_md)
+    append_log(
+        job.athlete,
+        "ok",
+        job.started,
+        time.time(),
+        f"Saved: {out_path.name} | Team={job.team}",
+    )
+    return out_path
+
+
+def fail_athlete(job: AthleteJob, reason) -> None:
+    append_log(job.athlete, "failed", job.started, time.time(), f"{reason} | Team={job.team}")
+    append_failure(job.athlete, f"{reason} | Team={job.team}")
+
+
+async def process_athlete_folder(
+    team: str, folder: Path, api_slot: Optional[asyncio.Semaphore] = None
+) -> Optional[Path]:
+    job, settled = prepare_athlete(team, folder)
+    if job is None:
+        return settled
+
+    # Encoding happens before we queue for an API slot, so it overlaps other athletes' calls
+    user_content = await asyncio.to_thread(build_user_content, job.prompt_text, job.images)
+
+    try:
+        async with api_slot or nullcontext():
+            completion_md = await call_with_retries(MODEL, user_content)
+        return finish_athlete(job, completion_md)
     except Exception as e:
-        append_log(athlete, "failed", started, time.time(), f"{e} | Team={team}")
-        append_failure(athlete, f"{e} | Team={team}")
+        fail_athlete(job, e)
         return None
 
 
-def main():
+async def run_all():
+    global sink
     print(f"[INFO] Scanning base directory: {BASE_DIR}")
 
     pairs = gather_team_athletes(BASE_DIR)
@@ -423,34 +660,256 @@ def main():
         print("[WARN] No team/athlete folders found.")
         return
 
-    # Group by team for nicer console output
-    current_team = None
-    successes_since_break = 0
-    total_success = 0
-
-    for team, athlete_dir in pairs:
-        if team != current_team:
-            current_team = team
-            print(f"\n[TEAM] {current_team if current_team else '(none)'}")
-
-        print(f"[RUN ] {athlete_dir.name}")
-        res = process_athlete_folder(team, athlete_dir)
-        if res:
-            print(f"[DONE] {athlete_dir.name} -> {res.name}")
-            successes_since_break += 1
-            total_success += 1
-
-            # Cooldown after every N successful generations
-            if successes_since_break >= BATCH_SUCCESS_SIZE:
-                print(
-                    f"[SLEEP] Completed {successes_since_break} markdowns. Cooling down for {BATCH_COOLDOWN_SECONDS}s..."
-                )
-                time.sleep(BATCH_COOLDOWN_SECONDS)
-                successes_since_break = 0
-        else:
+    print(
+        f"[INFO] {len(pairs)} athlete folders | concurrency={CONCURRENCY} | rpm={RATE_LIMIT_RPM}"
+    )
+    sem = asyncio.Semaphore(max(1, CONCURRENCY))  # API calls in flight
+    # Athletes holding encoded images: the in-flight ones + a few prefetched and waiting for a slot
+    prep = asyncio.Semaphore(max(1, CONCURRENCY) + PREFETCH_AHEAD)
+    stats = {"since_break": 0, "total": 0}
+
+    async def run_one(team: str, athlete_dir: Path):
+        async with prep:
+            print(f"[RUN ] {team if team else '(none)'} / {athlete_dir.name}")
+            res = await process_athlete_folder(team, athlete_dir, api_slot=sem)
+        sink.flush()
+        if not res:
             print(f"[FAIL] {athlete_dir.name}")
+            return
+        print(f"[DONE] {athlete_dir.name} -> {res.name}")
+        stats["since_break"] += 1
+        stats["total"] += 1
+
+        # Cooldown after every N successful generations (holds back new requests)
+        if stats["since_break"] >= BATCH_SUCCESS_SIZE:
+            stats["since_break"] = 0
+            print(
+                f"[SLEEP] Completed {BATCH_SUCCESS_SIZE} markdowns. Cooling down for {BATCH_COOLDOWN_SECONDS}s..."
+            )
+            await rl.pause(BATCH_COOLDOWN_SECONDS)
+
+    sink = LogSink()
+    try:
+        await asyncio.gather(*(run_one(team, d) for team, d in pairs))
+    finally:
+        sink.close()
+        await _HTTPX.aclose()
+
+    print(f"\n[INFO] Completed. Successful markdowns: {stats['total']}")
+
+
+def set_base_dir(base_dir: Path):
+    """Point the scan and every base-relative file/cache at `base_dir`."""
+    global BASE_DIR, LOG_CSV, FAILED_LIST, B64_CACHE_DIR, RESP_CACHE_DIR, BATCH_DIR
+    BASE_DIR = base_dir
+    LOG_CSV = BASE_DIR / "run_log.csv"
+    FAILED_LIST = BASE_DIR / "failed.txt"
+    B64_CACHE_DIR = BASE_DIR / ".b64cache"
+    RESP_CACHE_DIR = BASE_DIR / ".respcache"
+    BATCH_DIR = BASE_DIR / ".batch"
+
+
+# ===================== BATCH MODE =====================
+async def _submit_batch_part(part_path: Path) -> str:
+    uploaded = await client.files.create(file=part_path, purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    print(f"[BATCH] Submitted {part_path.name} -> {batch.id}")
+    return batch.id
+
+
+def _batch_manifest(batch_id: str) -> Path:
+    return BATCH_DIR / f"{batch_id}.pending.json"
+
+
+def _save_batch_manifest(batch_id: str, jobs: dict) -> None:
+    """Record a submitted batch (custom_id -> team/folder) so a later run can still collect it."""
+    data = {
+        "batch_id": batch_id,
+        "jobs": {cid: [job.team, str(job.folder)] for cid, job in jobs.items()},
+    }
+    manifest = _batch_manifest(batch_id)
+    tmp = manifest.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, manifest)
+
+
+async def _resume_batches() -> int:
+    """Collect batches submitted by an earlier run that never saw them finish. Returns successes."""
+    pending = []
+    for manifest in sorted(BATCH_DIR.glob("*.pending.json")):
+        try:
+            data = json.loads(manifest.read_text(encoding="utf-8"))
+            batch_id = data["batch_id"]
+            saved = data["jobs"]
+        except Exception as e:
+            print(f"[WARN] Unreadable batch manifest {manifest.name}: {e}")
+            continue
+        jobs = {}
+        for cid, (team, folder) in saved.items():
+            job, _ = prepare_athlete(team, Path(folder))
+            if job is not None:
+                jobs[cid] = job
+        print(f"[BATCH] Resuming {batch_id} ({len(jobs)} athletes still pending)")
+        pending.append((batch_id, jobs))
+    if not pending:
+        return 0
+    results = await asyncio.gather(*(_collect_batch(bid, jobs) for bid, jobs in pending))
+    return sum(results)
+
+
+async def _collect_batch(batch_id: str, jobs: dict) -> int:
+    """Poll one batch until it finishes, then write every answered athlete. Returns successes."""
+    while True:
+        batch = await client.batches.retrieve(batch_id)
+        if batch.status in ("completed", "failed", "expired", "cancelled"):
+            break
+        counts = batch.request_counts
+        if counts:
+            print(
+                f"[BATCH] {batch_id}: {batch.status} ({counts.completed}/{counts.total} done)"
+            )
+        await asyncio.sleep(BATCH_POLL_SECONDS)
+
+    print(f"[BATCH] {batch_id}: {batch.status}")
+    ok = 0
+    answered = set()
+    if batch.output_file_id:
+        output = await client.files.content(batch.output_file_id)
+        (BATCH_DIR / f"{batch_id}_output.jsonl").write_text(output.text, encoding="utf-8")
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            job = jobs.get(row.get("custom_id"))
+            if job is None:
+                continue
+            answered.add(row["custom_id"])
+            response = row.get("response") or {}
+            try:
+                if response.get("status_code") != 200:
+                    raise RuntimeError(f"HTTP {response.get('status_code')}: {row.get('error')}")
+                msg = response["body"]["choices"][0]["message"]["content"]
+                if not msg:
+                    raise RuntimeError("Empty completion content.")
+                out_path = finish_athlete(job, msg)
+                print(f"[DONE] {job.athlete} -> {out_path.name}")
+                ok += 1
+            except Exception as e:
+                fail_athlete(job, e)
+                print(f"[FAIL] {job.athlete}")
+
+    for custom_id, job in jobs.items():
+        if custom_id not in answered:
+            fail_athlete(job, f"No batch result (batch {batch_id} {batch.status})")
+            print(f"[FAIL] {job.athlete}")
+    sink.flush()
+    _batch_manifest(batch_id).unlink(missing_ok=True)
+    return ok
+
+
+async def run_batch():
+    """
+    --batch: queue every pending athlete into Batch API JSONL files (split below the 200 MB cap),
+    submit them, poll until done and write the markdowns. No RPM pacing or cooldowns apply.
+    """
+    global sink
+    print(f"[INFO] Scanning base directory: {BASE_DIR}")
+
+    pairs = gather_team_athletes(BASE_DIR)
+    if not pairs:
+        print("[WARN] No team/athlete folders found.")
+        return
+
+    BATCH_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    parts: List[Tuple[Path, dict]] = []  # (jsonl path, custom_id -> job)
+    fh = None
+    settled_ok = 0
+
+    sink = LogSink()
+    try:
+        # Batches from an interrupted run are already paid for: collect them before queueing anew
+        settled_ok += await _resume_batches()
+
+        for idx, (team, folder) in enumerate(pairs):
+            job, settled = prepare_athlete(team, folder)
+            if job is None:
+                settled_ok += int(settled is not None)
+                continue
+
+            user_content = await asyncio.to_thread(
+                build_user_content, job.prompt_text, job.images
+            )
+            line = json.dumps(
+                {
+                    "custom_id": str(idx),  # athlete names can repeat across teams
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": MODEL,
+                        "messages": [{"role": "user", "content": user_content}],
+                        "temperature": TEMPERATURE,
+                    },
+                }
+            ).encode("utf-8") + b"\n"
+
+            if fh is None or fh.tell() + len(line) > BATCH_MAX_FILE_BYTES:
+                if fh is not None:
+                    fh.close()
+                part_path = BATCH_DIR / f"batch_input_{stamp}_{len(parts) + 1}.jsonl"
+                fh = part_path.open("wb")
+                parts.append((part_path, {}))
+            fh.write(line)
+            parts[-1][1][str(idx)] = job
+        if fh is not None:
+            fh.close()
+            fh = None
+        sink.flush()
+
+        queued = sum(len(jobs) for _, jobs in parts)
+        print(f"[INFO] {queued} athletes queued in {len(parts)} batch file(s)")
+        if not parts:
+            print(f"\n[INFO] Completed. Successful markdowns: {settled_ok}")
+            return
+
+        batch_ids = []
+        for path, jobs in parts:
+            batch_id = await _submit_batch_part(path)
+            _save_batch_manifest(batch_id, jobs)
+            batch_ids.append(batch_id)
+        results = await asyncio.gather(
+            *(_collect_batch(bid, jobs) for bid, (_, jobs) in zip(batch_ids, parts))
+        )
+        print(f"\n[INFO] Completed. Successful markdowns: {settled_ok + sum(results)}")
+    finally:
+        if fh is not None:
+            fh.close()
+        sink.close()
+        await _HTTPX.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate Analysis.md for each athlete folder (Base → Team → Athlete) with OpenAI vision."
+    )
+    parser.add_argument(
+        "--base-dir",
+        default=str(BASE_DIR),
+        help="Root directory that contains TEAM folders (default: D:/Vald Data)",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Use the OpenAI Batch API (half price, no RPM limits, results within 24h) instead of live calls.",
+    )
+    args = parser.parse_args()
 
-    print(f"\n[INFO] Completed. Successful markdowns: {total_success}")
+    set_base_dir(Path(args.base_dir))
+    asyncio.run(run_batch() if args.batch else run_all())
 
 
 if __name__ == "__main__":
@@ -22,11 +22,13 @@ Usage:
   python cleanup_vald_images.py --dry-run
   python cleanup_vald_images.py --teams "KC Fusion 10G Navy,KC Fusion 12B Gold"
   python cleanup_vald_images.py --prune-empty-teams
+  python cleanup_vald_images.py --athlete "D:\\Vald Data\\<Team>\\<Athlete>"
 """
 
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import argparse
-from typing import Iterable, List
+from typing import Iterable, List, Tuple
 import os
 
 TARGET_FILENAMES = [
@@ -35,60 +37,112 @@ TARGET_FILENAMES = [
     "5-0-5_Drill_001.png",
     "Nordic_001.png",
 ]
+_TARGET_SET = frozenset(TARGET_FILENAMES)
 
 VALID_IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".webp"}
 
+CLEANUP_WORKERS = 16  # athlete folders cleaned in parallel (pure filesystem I/O)
+
+
+def _subdirs(parent: Path) -> List[Path]:
+    """Child directories of parent (scandir: no extra stat per entry); dot-folders are caches, skipped."""
+    with os.scandir(parent) as it:
+        return [parent / e.name for e in it if e.is_dir() and not e.name.startswith(".")]
+
 
 def iter_team_dirs(root: Path) -> Iterable[Path]:
     """Yield team directories directly under the root."""
-    for child in root.iterdir():
-        if child.is_dir():
-            yield child
+    yield from _subdirs(root)
 
 
 def iter_athlete_dirs(team_dir: Path) -> Iterable[Path]:
     """Yield athlete directories directly under a team directory."""
-    for child in team_dir.iterdir():
-        if child.is_dir():
-            yield child
+    yield from _subdirs(team_dir)
 
 
 def is_dir_completely_empty(p: Path) -> bool:
     """True if directory has zero entries (no files, no subfolders)."""
-    try:
-        next(p.iterdir())
-        return False
-    except StopIteration:
-        return True
+    with os.scandir(p) as it:
+        return next(it, None) is None
 
 
 def delete_targets_in_athlete_dir(athlete_dir: Path, dry_run: bool = False) -> int:
     """Delete target files in a single athlete folder. Returns count deleted."""
+    return _delete_targets(athlete_dir, dry_run)[0]
+
+
+def _delete_targets(athlete_dir: Path, dry_run: bool) -> Tuple[int, bool]:
+    """Returns (count deleted, folder holds anything besides the targets)."""
     deleted_here = 0
+    # One directory listing instead of an exists() per target (targets are usually absent)
+    present = set()
+    has_others = False
+    try:
+        with os.scandir(athlete_dir) as it:
+            for e in it:
+                if e.name in _TARGET_SET and e.is_file(follow_symlinks=False):
+                    present.add(e.name)
+                else:
+                    has_others = True
+    except OSError as e:
+        print(f"[SKIP] {athlete_dir} -> {e}")
+        return 0, True
+
     for filename in TARGET_FILENAMES:
+        if filename not in present:
+            continue
         path = athlete_dir / filename
         try:
-            if path.exists():
-                if dry_run:
-                    print(f"[DRY] Would delete: {path}")
-                else:
-                    path.unlink()
-                    print(f"[DEL] {path}")
-                deleted_here += 1
+            if dry_run:
+                print(f"[DRY] Would delete: {path}")
+            else:
+                os.unlink(path)
+                print(f"[DEL] {path}")
+            deleted_here += 1
         except PermissionError:
             print(f"[SKIP] Permission denied: {path}")
         except Exception as e:
             print(f"[SKIP] {path} -> {e}")
-    return deleted_here
+    return deleted_here, has_others
+
+
+def cleanup_athlete_dir(athlete_dir: Path, dry_run: bool = False) -> Tuple[int, bool]:
+    """
+    Delete target files in one athlete folder, then remove the folder if it is now empty.
+    Returns (files_deleted, folder_removed).
+    """
+    # 1) Delete target files
+    deleted, has_others = _delete_targets(athlete_dir, dry_run)
+
+    # 2) If now empty, remove athlete folder (the listing above already tells us if other files remain)
+    removed = False
+    try:
+        if not has_others and is_dir_completely_empty(athlete_dir):
+            if dry_run:
+                print(f"[DRY] Would remove empty athlete folder: {athlete_dir}")
+            else:
+                athlete_dir.rmdir()
+                print(f"[DEL] {athlete_dir}")
+            removed = True
+        else:
+            print(f"[KEEP] {athlete_dir} (not empty)")
+    except PermissionError:
+        print(f"[SKIP] Permission denied: {athlete_dir}")
+    except Exception as e:
+        print(f"[SKIP] {athlete_dir} -> {e}")
+    return deleted, removed
 
 
 def folder_directly_contains_images(folder: Path) -> bool:
     """Heuristic to detect athlete folders directly under root (back-compat)."""
     try:
-        for name in os.listdir(folder):
-            p = folder / name
-            if p.is_file() and p.suffix.lower() in VALID_IMAGE_EXTS:
-                return True
+        with os.scandir(folder) as it:
+            for e in it:
+                if (
+                    os.path.splitext(e.name)[1].lower() in VALID_IMAGE_EXTS
+                    and e.is_file()
+                ):
+                    return True
     except Exception:
         pass
     return False
@@ -114,44 +168,49 @@ def cleanup_team_tree(
     athlete_dirs_removed = 0
     team_dirs_removed = 0
 
+    # One pass over root: folders that directly contain images are athletes (back-compat),
+    # everything else is a team. Each folder is scanned for images only once.
+    team_dirs: List[Path] = []
+    direct_athletes: List[Path] = []
+    for child in iter_team_dirs(root):
+        (direct_athletes if folder_directly_contains_images(child) else team_dirs).append(child)
+
     # ---------- Team -> Athlete structure ----------
-    for team_dir in iter_team_dirs(root):
+    selected_teams: List[Path] = []
+    athlete_dirs: List[Path] = []
+    for team_dir in team_dirs:
         team_name = team_dir.name
-        # Treat directories that obviously look like athlete folders (contain images directly) as back-compat; skip here
-        # They will be handled in the back-compat pass below.
-        if folder_directly_contains_images(team_dir):
-            continue
 
         if teams_filter_norm and team_name.lower() not in teams_filter_norm:
             continue
 
-        print(f"\n[TEAM] {team_name}")
+        team_athletes = list(iter_athlete_dirs(team_dir))
+        print(f"[TEAM] {team_name} ({len(team_athletes)} athlete folders)")
         teams_seen += 1
+        selected_teams.append(team_dir)
+        athlete_dirs.extend(team_athletes)
 
-        for athlete_dir in iter_athlete_dirs(team_dir):
+    # ---------- Back-compat: athletes directly under root ----------
+    # Only folders with images are treated as athlete folders here.
+    if direct_athletes:
+        print(
+            f"[INFO] Also scanning {len(direct_athletes)} athlete folders directly under root (back-compat)."
+        )
+    athlete_dirs.extend(direct_athletes)
+
+    # Athlete folders are independent -> clean them concurrently (each task unlinks, then rmdirs its own folder)
+    print()
+    with ThreadPoolExecutor(max_workers=CLEANUP_WORKERS) as ex:
+        for deleted, removed in ex.map(
+            lambda d: cleanup_athlete_dir(d, dry_run=dry_run), athlete_dirs
+        ):
             athletes_seen += 1
+            files_deleted += deleted
+            athlete_dirs_removed += int(removed)
 
-            # 1) Delete target files
-            files_deleted += delete_targets_in_athlete_dir(athlete_dir, dry_run=dry_run)
-
-            # 2) If now empty, remove athlete folder
-            try:
-                if is_dir_completely_empty(athlete_dir):
-                    if dry_run:
-                        print(f"[DRY] Would remove empty athlete folder: {athlete_dir}")
-                    else:
-                        athlete_dir.rmdir()
-                        print(f"[DEL] {athlete_dir}")
-                    athlete_dirs_removed += 1
-                else:
-                    print(f"[KEEP] {athlete_dir} (not empty)")
-            except PermissionError:
-                print(f"[SKIP] Permission denied: {athlete_dir}")
-            except Exception as e:
-                print(f"[SKIP] {athlete_dir} -> {e}")
-
-        # 3) Optionally prune team folder if it became empty
-        if prune_empty_teams:
+    # 3) Optionally prune team folders that became empty (after every athlete is done)
+    if prune_empty_teams:
+        for team_dir in selected_teams:
             try:
                 if is_dir_completely_empty(team_dir):
                     if dry_run:
@@ -165,33 +224,6 @@ def cleanup_team_tree(
             except Exception as e:
                 print(f"[SKIP] {team_dir} -> {e}")
 
-    # ---------- Back-compat: athletes directly under root ----------
-    # Only folders with images are treated as athlete folders here.
-    direct_athletes = [
-        p for p in root.iterdir() if p.is_dir() and folder_directly_contains_images(p)
-    ]
-    if direct_athletes:
-        print(
-            "\n[INFO] Also scanning athlete folders directly under root (back-compat)."
-        )
-    for athlete_dir in direct_athletes:
-        athletes_seen += 1
-        files_deleted += delete_targets_in_athlete_dir(athlete_dir, dry_run=dry_run)
-        try:
-            if is_dir_completely_empty(athlete_dir):
-                if dry_run:
-                    print(f"[DRY] Would remove empty athlete folder: {athlete_dir}")
-                else:
-                    athlete_dir.rmdir()
-                    print(f"[DEL] {athlete_dir}")
-                athlete_dirs_removed += 1
-            else:
-                print(f"[KEEP] {athlete_dir} (not empty)")
-        except PermissionError:
-            print(f"[SKIP] Permission denied: {athlete_dir}")
-        except Exception as e:
-            print(f"[SKIP] {athlete_dir} -> {e}")
-
     # ---------- Summary ----------
     print(
         f"\nDone. Teams scanned: {teams_seen} | Athlete folders checked: {athletes_seen} | "
@@ -231,8 +263,22 @@ def main():
         action="store_true",
         help="Also remove a team folder if it ends up completely empty.",
     )
+    parser.add_argument(
+        "--athlete",
+        type=str,
+        default="",
+        help="Clean only this single athlete folder (used by the scraper after each athlete).",
+    )
     args = parser.parse_args()
 
+    if args.athlete:
+        athlete_dir = Path(args.athlete)
+        if not athlete_dir.is_dir():
+            print(f"[ERR] Athlete folder does not exist: {athlete_dir}")
+            return
+        cleanup_athlete_dir(athlete_dir, dry_run=args.dry_run)
+        return
+
     teams_filter = [t.strip() for t in args.teams.split(",")] if args.teams else []
     cleanup_team_tree(
         Path(args.root),
@@ -1,22 +1,65 @@
 # grok_generate.py
+import asyncio
+import atexit
 import os
+import random
+import re
 import time
 import csv
+import io
 import argparse
+import fnmatch
+import hashlib
+import json
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
-from typing import Optional, Tuple, List
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple, List
 
+import httpx
 from dotenv import load_dotenv
 
 # OpenAI-compatible client pointing at xAI
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI
 except Exception:
     raise SystemExit(
         "OpenAI python client not found. Install with:\n  pip install openai python-dotenv python-docx"
     )
 
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]")
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Granular error types (openai>=1.0); fall back to "never matches" if missing
+try:
+    from openai import RateLimitError
+except Exception:
+    RateLimitError = ()
+try:
+    from openai import AuthenticationError, BadRequestError, PermissionDeniedError, NotFoundError
+
+    NON_RETRYABLE_ERRORS = (
+        AuthenticationError,
+        BadRequestError,
+        PermissionDeniedError,
+        NotFoundError,
+    )
+except Exception:
+    NON_RETRYABLE_ERRORS = ()
+
+# Optional exact token counting (falls back to ~4 chars/token)
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
 # DOCX writer
 try:
     from docx import Document
@@ -29,38 +72,124 @@ except Exception:
 DEFAULT_BASE_DIR = Path(r"D:/Vald Data")  # Root: contains team folders
 DEFAULT_MODEL = "grok-3-mini"
 DEFAULT_RPM = 2  # 2 requests/minute (simple pacing)
+DEFAULT_CONCURRENCY = 4  # athletes in flight at once
+DEFAULT_TPM = 0  # tokens/minute budget (0 = don't track tokens)
+EST_COMPLETION_TOKENS = 800  # rough size of one training program reply
+MAX_ANALYSIS_TOKENS = 12000  # longer analyses are failed (or cut with --truncate-long-analysis)
+TOKEN_ENCODING = "o200k_base"  # tiktoken encoding used to approximate Grok's tokenizer
+MAX_RETRIES = 5
+BACKOFF_BASE = 3  # seconds; full-jitter sleep is uniform(0, min(BACKOFF_CAP, base * 2**attempt))
+BACKOFF_CAP = 60
+XAI_BASE_URL = "https://api.x.ai/v1"
+HTTP_TIMEOUT = 600.0  # seconds per request (a full plan can take minutes); connect is capped at 10 s
 AGE_GROUP_TEXT = "11–16 years old female"
 
 LOG_CSV = "run_grok_log.csv"
+RESPONSE_CACHE = ".grok_cache.json"  # model|prompt hash -> Grok reply, in the base directory
 FAIL_LIST = "failed_grok.txt"
 
 
 # ------------------------- Utilities -------------------------
+_ISO_CACHE = [0, ""]  # [epoch second, formatted] - log columns only have second resolution
+
+
 def now_iso() -> str:
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    t = int(time.time())
+    if t != _ISO_CACHE[0]:
+        _ISO_CACHE[1] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t))
+        _ISO_CACHE[0] = t
+    return _ISO_CACHE[1]
 
 
-class RateLimiter:
-    """Simple rate limiter: at most `rpm` requests per minute."""
+class AsyncRateLimiter:
+    """
+    Sliding 60 s window shared by all async workers: at most `rpm` requests and (if `tpm` > 0)
+    `tpm` estimated tokens per window. On a 429 the request cap halves; every clean minute
+    afterwards it grows back by one, up to the configured `rpm` (AIMD).
+    """
 
-    def __init__(self, rpm: int):
-        self.min_interval = 60.0 / max(1, rpm)
-        self.last_call: float = 0.0
+    def __init__(self, rpm: int, tpm: int = 0, window: float = 60.0):
+        self.max_rpm = max(1, rpm)
+        self.rpm = self.max_rpm
+        self.tpm = max(0, tpm)
+        self.window = window
+        self.calls: deque = deque()  # (timestamp, est_tokens)
+        self.tokens_in_window = 0
+        self.last_adjust = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self.calls and now - self.calls[0][0] >= self.window:
+            self.tokens_in_window -= self.calls.popleft()[1]
+
+    def _grow(self, now: float) -> None:
+        if self.rpm < self.max_rpm and now - self.last_adjust >= self.window:
+            self.rpm += 1
+            self.last_adjust = now
+
+    async def acquire(self, est_tokens: int = 0) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                self._grow(now)
+                fits_tokens = (
+                    not self.tpm
+                    or not self.calls  # a single oversized request still has to go out
+                    or self.tokens_in_window + est_tokens <= self.tpm
+                )
+                if len(self.calls) < self.rpm and fits_tokens:
+                    self.calls.append((now, est_tokens))
+                    self.tokens_in_window += est_tokens
+                    return
+                # Sleep until the oldest request leaves the window
+                await asyncio.sleep(max(0.05, self.calls[0][0] + self.window - now))
 
-    def wait(self):
-        if self.last_call <= 0:
-            return
-        elapsed = time.time() - self.last_call
-        sleep_for = self.min_interval - elapsed
-        if sleep_for > 0:
-            time.sleep(sleep_for)
+    def on_rate_limited(self) -> None:
+        self.rpm = max(1, self.rpm // 2)
+        self.last_adjust = time.monotonic()
+
+
+_ENC = None  # tiktoken encoding, loaded on first use; False once it proved unavailable
+
+
+def _encoding():
+    global _ENC
+    if _ENC is None:
+        _ENC = False
+        if tiktoken is not None:
+            try:
+                _ENC = tiktoken.get_encoding(TOKEN_ENCODING)
+            except Exception:
+                pass  # e.g. no network to fetch the BPE file -> char heuristic
+    return _ENC or None
 
-    def stamp(self):
-        self.last_call = time.time()
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    return len(enc.encode(text)) if enc else len(text) // 4
+
+
+def estimate_tokens(prompt: str) -> int:
+    return count_tokens(prompt) + EST_COMPLETION_TOKENS
+
+
+def truncate_analysis(analysis_md: str) -> str:
+    """Keep the start of an over-long analysis (header + first tests) within MAX_ANALYSIS_TOKENS."""
+    enc = _encoding()
+    if enc is None:
+        max_chars = MAX_ANALYSIS_TOKENS * 4
+        return analysis_md if len(analysis_md) <= max_chars else analysis_md[:max_chars]
+    ids = enc.encode(analysis_md)
+    if len(ids) <= MAX_ANALYSIS_TOKENS:
+        return analysis_md
+    return enc.decode(ids[:MAX_ANALYSIS_TOKENS])
 
 
 def read_text(path: Path) -> str:
-    return path.read_text(encoding="utf-8", errors="ignore")
+    # One bytes.decode (C fast path) + the newline normalisation text mode would have done
+    text = path.read_bytes().decode("utf-8", "ignore")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
 
 
 def ensure_log_headers(log_path: Path) -> None:
@@ -73,24 +202,128 @@ def ensure_log_headers(log_path: Path) -> None:
             )
 
 
-def append_log(log_path: Path, row: list) -> None:
-    with log_path.open("a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(row)
+def _csv_escape(value) -> str:
+    """QUOTE_MINIMAL by hand: only fields with a delimiter, quote or newline get quoted."""
+    s = str(value)
+    if "," in s or '"' in s or "\n" in s or "\r" in s:
+        return '"' + s.replace('"', '""') + '"'
+    return s
 
 
-def append_fail(fail_path: Path, athlete: str, reason: str) -> None:
-    with fail_path.open("a", encoding="utf-8") as f:
-        f.write(f"[{now_iso()}] {athlete} -> {reason}\n")
+def csv_line(row: Iterable) -> str:
+    # Same output as csv.writer (default dialect, \r\n terminator) for our fixed 6-column rows
+    return ",".join(_csv_escape(c) for c in row) + "\r\n"
 
 
-def build_prompt(athlete_name: str, analysis_md: str) -> str:
+class LogSink:
     """
-    Compose the user prompt for Grok. Includes the analysis markdown as context.
+    Buffers run-log CSV rows and fail-list lines in memory and hands every `flush_every`
+    entries (plus whatever is left on close) to a single writer thread, so the event loop
+    never waits on the disk. One writer thread keeps the lines in order.
+    """
+
+    def __init__(self, log_path: Path, fail_path: Path, flush_every: int = 16):
+        ensure_log_headers(log_path)
+        self._log_fh = log_path.open("a", newline="", encoding="utf-8")
+        self._fail_fh = fail_path.open("a", encoding="utf-8")
+        self._log_buf: List[str] = []
+        self._fail_buf: List[str] = []
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="grok-log")
+        self._flush_every = max(1, flush_every)
+        self._pending = 0
+        self._closed = False
+        atexit.register(self.close)
+
+    def _wrote(self) -> None:
+        self._pending += 1
+        if self._pending >= self._flush_every:
+            self.flush()
+
+    def log(self, row: list) -> None:
+        self._log_buf.append(csv_line(row))
+        self._wrote()
+
+    def fail(self, athlete: str, reason: str) -> None:
+        self._fail_buf.append(f"[{now_iso()}] {athlete} -> {reason}\n")
+        self._wrote()
+
+    @staticmethod
+    def _write_out(log_fh, log_text: str, fail_fh, fail_text: str) -> None:
+        for fh, text in ((log_fh, log_text), (fail_fh, fail_text)):
+            if text:
+                fh.write(text)
+                fh.flush()
+
+    def flush(self) -> None:
+        if self._closed or not self._pending:
+            return
+        self._pending = 0
+        log_text = "".join(self._log_buf)
+        self._log_buf.clear()
+        fail_text = "".join(self._fail_buf)
+        self._fail_buf.clear()
+        self._io.submit(self._write_out, self._log_fh, log_text, self._fail_fh, fail_text)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._io.shutdown(wait=True)
+        for fh in (self._log_fh, self._fail_fh):
+            try:
+                fh.close()
+            except Exception:
+                pass
+
+
+class ResponseCache:
     """
-    user_prompt = f"""
+    Grok replies keyed by blake2b(model|prompt), persisted as a JSON sidecar so identical
+    prompts (re-runs, duplicated analyses) are answered without another API call.
+    Saved atomically (temp file + os.replace) at the end of the run and again at exit.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._data: dict = {}
+        self._dirty = False
+        try:
+            self._data = json.loads(path.read_bytes().decode("utf-8"))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[WARN] Ignoring unreadable response cache {path.name}: {e}")
+        atexit.register(self.save)
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        return hashlib.blake2b(f"{model}|{prompt}".encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        return self._data.get(key)
+
+    def put(self, key: str, reply: str) -> None:
+        if reply:
+            self._data[key] = reply
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        try:
+            fd, tmp = tempfile.mkstemp(prefix=self.path.name, suffix=".tmp", dir=self.path.parent)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except Exception as e:
+            print(f"[WARN] Could not save response cache {self.path.name}: {e}")
+
+
+PROMPT_TEMPLATE = """
 Act as a physical coach and give me an 8 weeks training program for {athlete_name}
-who is a female athlete. Her age group is {AGE_GROUP_TEXT}.
+who is a female athlete. Her age group is {age_group}.
 Don't make it too big. The training program should include at least:
 - Program Overview
 - Goals
@@ -105,184 +338,383 @@ to tailor the plan. If something is unclear, make sensible, coaching-appropriate
 {analysis_md}
 --- END ATHLETE ANALYSIS ---
 """.strip()
-    return user_prompt
 
+SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": (
+        "You are an expert physical performance coach. "
+        "Return Markdown only. Keep the plan concise, structured, and actionable."
+    ),
+}
+CHAT_KWARGS = {"temperature": 0.7}  # fixed request options shared by every call
+
+
+def build_prompt(athlete_name: str, analysis_md: str) -> str:
+    """
+    Compose the user prompt for Grok. Includes the analysis markdown as context.
+    """
+    # format_map substitutes values verbatim, so braces inside the analysis are safe
+    return PROMPT_TEMPLATE.format_map(
+        {
+            "athlete_name": athlete_name,
+            "age_group": AGE_GROUP_TEXT,
+            "analysis_md": analysis_md,
+        }
+    )
+
+
+def _retry_after_seconds(err: Exception) -> Optional[float]:
+    try:
+        value = err.response.headers.get("retry-after")
+        return max(0.0, float(value)) if value else None
+    except Exception:
+        return None
+
+
+def _jitter_backoff(attempt: int) -> float:
+    # Full jitter: concurrent workers that failed together don't retry together
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2**attempt)))
 
-def call_grok(client: OpenAI, model: str, prompt: str) -> str:
+
+async def _stream_reply(
+    client: AsyncOpenAI, model: str, messages: list, emitter: "MarkdownDocxEmitter"
+) -> str:
+    """Stream one completion, feeding each finished line to `emitter` as it arrives."""
+    stream = await client.chat.completions.create(
+        model=model, messages=messages, stream=True, **CHAT_KWARGS
+    )
+    parts: List[str] = []
+    pending = ""
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if not delta:
+            continue
+        parts.append(delta)
+        pending += delta
+        if "\n" in delta:
+            *done, pending = pending.split("\n")
+            for line in done:
+                emitter.feed(line)
+    if pending:
+        emitter.feed(pending)
+    return "".join(parts)
+
+
+async def call_grok(
+    client: AsyncOpenAI,
+    model: str,
+    prompt: str,
+    rl: Optional[AsyncRateLimiter] = None,
+    stream_title: Optional[str] = None,
+) -> Tuple[str, Optional["MarkdownDocxEmitter"]]:
     """
     Send the prompt to Grok (OpenAI-compatible chat completions) and return the text.
-    Includes light retry with exponential backoff.
+    With `stream_title`, the reply is streamed into a MarkdownDocxEmitter (returned alongside
+    the text) so the document is laid out while tokens arrive; otherwise the emitter is None.
+    Retries with full-jitter exponential backoff, honours Retry-After on 429s and
+    fails fast on errors a retry can't fix (auth, bad request, unknown model).
     """
-    backoff = 3
     last_err: Optional[Exception] = None
+    messages = [SYSTEM_MESSAGE, {"role": "user", "content": prompt}]  # reused across retries
+    est_tokens = estimate_tokens(prompt)
 
-    for attempt in range(1, 4):
+    for attempt in range(1, MAX_RETRIES + 1):
         try:
-            resp = client.chat.completions.create(
+            if rl is not None:
+                await rl.acquire(est_tokens)
+            if stream_title is not None:
+                # fresh document per attempt: a dropped stream must not leave half a plan behind
+                emitter = MarkdownDocxEmitter(stream_title)
+                return await _stream_reply(client, model, messages, emitter), emitter
+            resp = await client.chat.completions.create(
                 model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are an expert physical performance coach. "
-                            "Return Markdown only. Keep the plan concise, structured, and actionable."
-                        ),
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.7,
+                messages=messages,
+                **CHAT_KWARGS,
+            )
+            return resp.choices[0].message.content or "", None
+        except NON_RETRYABLE_ERRORS as e:
+            raise RuntimeError(f"Grok API call failed (not retryable): {e}") from e
+        except RateLimitError as e:
+            last_err = e
+            if rl is not None:
+                rl.on_rate_limited()
+            retry_after = _retry_after_seconds(e)
+            await asyncio.sleep(
+                retry_after if retry_after is not None else _jitter_backoff(attempt)
             )
-            return resp.choices[0].message.content or ""
         except Exception as e:
             last_err = e
-            time.sleep(backoff)
-            backoff *= 2
+            await asyncio.sleep(_jitter_backoff(attempt))
 
     raise RuntimeError(f"Grok API call failed after retries: {last_err}")
 
 
 # ------------------------- Markdown -> DOCX -------------------------
-def markdown_to_docx(md_text: str, out_path: Path, title: Optional[str] = None) -> None:
+# One match per line picks the block type; alternatives are tried in priority order.
+_MD_LINE_RE = re.compile(
+    r"(?P<fence>\s*```)"
+    r"|(?P<hr>\s*(?:---|\*\*\*|___)\s*\Z)"
+    r"|(?P<hdr>#+)(?P<htxt>.*)"
+    r"|\s*[-*•] (?P<btxt>.*)"
+    r"|\s*[1-9]\. (?P<ntxt>.*)"
+)
+
+
+class MarkdownDocxEmitter:
     """
-    Minimal Markdown-to-DOCX converter for headings and lists.
+    Minimal Markdown-to-DOCX converter for headings and lists, fed one line at a time
+    (so a streamed reply can be laid out while it is still arriving).
     Keeps things simple but produces a clean .docx.
     """
-    doc = Document()
 
-    # Optional title at the top
-    if title:
-        t = doc.add_heading(title, level=0)
-        for run in t.runs:
-            run.font.size = Pt(16)
+    def __init__(self, title: Optional[str] = None):
+        self.doc = Document()
+        self.in_code_block = False
+
+        # Optional title at the top
+        if title:
+            t = self.doc.add_heading(title, level=0)
+            for run in t.runs:
+                run.font.size = Pt(16)
 
-    in_code_block = False
-    for raw_line in md_text.splitlines():
-        line = raw_line.rstrip("\n")
+    def feed(self, line: str) -> None:
+        doc = self.doc
+        line = line.rstrip("\r\n")
+        m = _MD_LINE_RE.match(line)
+        kind = m.lastgroup if m else None
 
         # code fences
-        if line.strip().startswith("```"):
-            in_code_block = not in_code_block
+        if kind == "fence":
+            self.in_code_block = not self.in_code_block
             doc.add_paragraph()
-            continue
+            return
 
-        if in_code_block:
+        if self.in_code_block:
             p = doc.add_paragraph(line)
             for run in p.runs:
                 run.font.name = "Consolas"
-            continue
+            return
 
         # horizontal rule
-        if line.strip() in ("---", "***", "___"):
+        if kind == "hr":
             doc.add_paragraph().add_run("—" * 20)
-            continue
+            return
 
         # headings: # .. ######
-        if line.startswith("#"):
-            hashes = len(line) - len(line.lstrip("#"))
-            text = line[hashes:].strip()
-            level = min(max(hashes, 1), 6)
-            doc.add_heading(text or " ", level=level)
-            continue
+        if kind == "htxt":
+            level = min(len(m.group("hdr")), 6)
+            doc.add_heading(m.group("htxt").strip() or " ", level=level)
+            return
 
         # bullets
-        if line.lstrip().startswith(("- ", "* ", "• ")):
-            text = line.lstrip()[2:].strip() if len(line.lstrip()) >= 2 else ""
-            doc.add_paragraph(text, style="List Bullet")
-            continue
+        if kind == "btxt":
+            doc.add_paragraph(m.group("btxt").strip(), style="List Bullet")
+            return
 
         # numbered list (simple 1. 2. 3. detection)
-        stripped = line.lstrip()
-        if any(
-            stripped.startswith(prefix) for prefix in [f"{i}. " for i in range(1, 10)]
-        ):
-            text = stripped[stripped.find(".") + 1 :].strip()
-            doc.add_paragraph(text, style="List Number")
-            continue
+        if kind == "ntxt":
+            doc.add_paragraph(m.group("ntxt").strip(), style="List Number")
+            return
 
         # blank line -> spacing
         if not line.strip():
             doc.add_paragraph()
-            continue
+            return
 
         # regular paragraph
         doc.add_paragraph(line)
 
-    doc.save(str(out_path))
+    def save(self, out_path: Path) -> None:
+        # Zip into memory, write it in one go next to the target, then swap it in atomically:
+        # a crash mid-save never leaves a truncated .docx in place of a good one
+        buf = io.BytesIO()
+        self.doc.save(buf)
+        tmp = out_path.with_suffix(".docx.tmp")
+        try:
+            tmp.write_bytes(buf.getvalue())
+            os.replace(tmp, out_path)
+        except Exception:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            raise
 
 
-# ------------------------- Team/Athlete discovery -------------------------
-def list_team_dirs(base: Path) -> List[Path]:
-    """Team folders are direct subfolders of base (sorted)."""
-    teams = [p for p in base.iterdir() if p.is_dir()]
-    return sorted(teams, key=lambda p: p.name.lower())
+def markdown_to_docx(
+    md_lines: Iterable[str], out_path: Path, title: Optional[str] = None
+) -> None:
+    """
+    Convert a whole reply in one go.
+    `md_lines` is any line iterable (e.g. io.StringIO / an open file); it is consumed lazily.
+    """
+    emitter = MarkdownDocxEmitter(title)
+    for line in md_lines:
+        emitter.feed(line)
+    emitter.save(out_path)
+
+
+def write_docx(md_text: str, out_path: Path, title: Optional[str] = None) -> None:
+    """Picklable entry point for DOCX_POOL workers (a StringIO can't cross processes)."""
+    markdown_to_docx(io.StringIO(md_text), out_path, title=title)
+
+
+# python-docx is pure-Python XML work (GIL-bound), so documents are built in worker processes.
+# Set up by run_grok_generation_async; None -> default thread pool.
+DOCX_POOL: Optional[ProcessPoolExecutor] = None
 
 
-def list_athlete_dirs(team_dir: Path) -> List[Path]:
-    """Athlete folders are direct subfolders of a team folder (sorted)."""
-    athletes = [p for p in team_dir.iterdir() if p.is_dir()]
-    return sorted(athletes, key=lambda p: p.name.lower())
+# ------------------------- Team/Athlete discovery -------------------------
+@dataclass
+class WorkItem:
+    team: str
+    athlete: str  # folder name, stripped
+    athlete_dir: Path
+    analysis: Optional[Path]  # None -> nothing to build a program from
+    out: Path
+    out_exists: bool
+    up_to_date: bool  # output is newer than the analysis it was built from
+    label: str  # "(i/n) Team → Athlete" for console output
+
+
+def list_subdirs(parent: Path) -> List[os.DirEntry]:
+    """
+    Direct subfolders of parent, sorted by name (scandir: type info comes free).
+    Dot-folders (.b64cache, .respcache, .batch, ...) are caches, never teams or athletes.
+    """
+    with os.scandir(parent) as it:
+        return sorted(
+            (e for e in it if e.is_dir() and not e.name.startswith(".")),
+            key=lambda e: e.name.lower(),
+        )
 
 
-def find_analysis_file(athlete_dir: Path, athlete_name: str) -> Optional[Path]:
+def pick_analysis_file(
+    athlete_dir: Path, athlete_name: str, names: set
+) -> Optional[Path]:
     """
     Prefer the exact "{Athlete} Analysis.md". If not found, fall back to the first "* Analysis.md".
+    `names` is the folder's directory listing.
     """
-    exact = athlete_dir / f"{athlete_name} Analysis.md"
-    if exact.exists():
-        return exact
-    # fallback: any "* Analysis.md"
-    candidates = sorted(athlete_dir.glob("* Analysis.md"))
-    return candidates[0] if candidates else None
+    exact = f"{athlete_name} Analysis.md"
+    if exact in names:
+        return athlete_dir / exact
+    # fallback: any "* Analysis.md" (fnmatch follows the OS's case rules, like glob)
+    candidates = sorted(n for n in names if fnmatch.fnmatch(n, "* Analysis.md"))
+    return athlete_dir / candidates[0] if candidates else None
+
+
+def plan(base_dir: Path) -> List[Tuple[str, List[WorkItem]]]:
+    """
+    One pass over Base → Team → Athlete: a single directory listing per athlete folder
+    resolves the analysis file and whether the output already exists.
+    """
+    teams: List[Tuple[str, List[WorkItem]]] = []
+    for team_entry in list_subdirs(base_dir):
+        athlete_entries = list_subdirs(Path(team_entry.path))
+        items: List[WorkItem] = []
+        for a_idx, entry in enumerate(athlete_entries, start=1):
+            athlete_dir = Path(entry.path)
+            athlete = entry.name.strip()
+            try:
+                with os.scandir(athlete_dir) as it:
+                    entries = {e.name: e for e in it}
+            except OSError:
+                entries = {}
+            names = set(entries)
+            out_name = f"{athlete} 8 Weeks Training Program.docx"
+            analysis = pick_analysis_file(athlete_dir, athlete, names)
+            up_to_date = False
+            if analysis is not None and out_name in entries:
+                try:
+                    up_to_date = (
+                        entries[out_name].stat().st_mtime_ns
+                        >= entries[analysis.name].stat().st_mtime_ns
+                    )
+                except OSError:
+                    pass
+            items.append(
+                WorkItem(
+                    team=team_entry.name,
+                    athlete=athlete,
+                    athlete_dir=athlete_dir,
+                    analysis=analysis,
+                    out=athlete_dir / out_name,
+                    out_exists=out_name in names,
+                    up_to_date=up_to_date,
+                    label=f"({a_idx}/{len(athlete_entries)}) {team_entry.name} → {entry.name}",
+                )
+            )
+        teams.append((team_entry.name, items))
+    return teams
 
 
 # ------------------------- Processing -------------------------
-def process_athlete_folder(
-    client: OpenAI,
+async def process_athlete_folder(
+    client: AsyncOpenAI,
     model: str,
-    team_name: str,
-    athlete_dir: Path,
-    rl: RateLimiter,
-    overwrite: bool = True,
+    item: WorkItem,
+    rl: AsyncRateLimiter,
+    stream: bool = True,
+    cache: Optional[ResponseCache] = None,
+    truncate_long: bool = False,
 ) -> Tuple[bool, str]:
     """
     Returns (success, message). Writes the training program DOCX on success.
+    Paths were resolved by plan(); nothing is re-checked on disk here.
+    A reply already in `cache` for the same model + prompt is reused without an API call.
+    An analysis over MAX_ANALYSIS_TOKENS fails before any API call, unless
+    `truncate_long` is set, in which case only its start is sent.
     """
-    athlete_name = athlete_dir.name.strip()
-    analysis_file = find_analysis_file(athlete_dir, athlete_name)
-    out_file = athlete_dir / f"{athlete_name} 8 Weeks Training Program.docx"
-
-    if not analysis_file or not analysis_file.exists():
-        return False, f"Analysis file not found for athlete: {athlete_name}"
-
     try:
-        analysis_md = read_text(analysis_file)
+        analysis_md = read_text(item.analysis)
     except Exception as e:
         return False, f"Failed to read analysis: {e}"
 
-    # Build prompt
-    prompt = build_prompt(athlete_name, analysis_md)
-
-    # Rate-limit
-    rl.wait()
-    try:
-        result_md = call_grok(client, model, prompt)
-    finally:
-        rl.stamp()
+    n_tokens = count_tokens(analysis_md)
+    if n_tokens > MAX_ANALYSIS_TOKENS:
+        if not truncate_long:
+            return False, (
+                f"Analysis is ~{n_tokens} tokens, over MAX_ANALYSIS_TOKENS={MAX_ANALYSIS_TOKENS}; "
+                "not sent (pass --truncate-long-analysis to send only its start)"
+            )
+        print(
+            f"  {item.label} WARN - analysis is ~{n_tokens} tokens; "
+            f"sending the first {MAX_ANALYSIS_TOKENS}"
+        )
+        analysis_md = truncate_analysis(analysis_md)
 
-    # Write output as DOCX (overwrite by default)
-    if out_file.exists() and not overwrite:
-        return True, f"Exists (overwrite=False): {out_file.name}"
+    # Build prompt
+    prompt = build_prompt(item.athlete, analysis_md)
+
+    title = f"{item.athlete} — 8 Weeks Training Program"
+
+    cache_key = ResponseCache.key(model, prompt) if cache is not None else None
+    cached = cache.get(cache_key) if cache is not None else None
+    if cached is not None:
+        result_md, emitter = cached, None
+    else:
+        # Rate-limited inside (every attempt, including retries, takes a slot)
+        result_md, emitter = await call_grok(
+            client, model, prompt, rl, stream_title=title if stream else None
+        )
+        if cache is not None:
+            cache.put(cache_key, result_md)
 
     try:
-        markdown_to_docx(
-            result_md,
-            out_file,
-            title=f"{athlete_name} — 8 Weeks Training Program",
-        )
+        if emitter is not None:
+            # Paragraphs were added while streaming; only serialising the file is left
+            await asyncio.to_thread(emitter.save, item.out)
+        else:
+            # python-docx is pure CPU work -> off the event loop and, via DOCX_POOL, onto other cores
+            # (a cache hit while streaming has no pool and falls back to the default thread pool)
+            await asyncio.get_running_loop().run_in_executor(
+                DOCX_POOL, write_docx, result_md, item.out, title
+            )
     except Exception as e:
         return False, f"Failed to write DOCX: {e}"
 
-    return True, str(out_file)
+    return True, str(item.out)
 
 
 def main():
@@ -315,6 +747,18 @@ def main():
         default=DEFAULT_RPM,
         help="Requests per minute rate limit (default: 2)",
     )
+    parser.add_argument(
+        "--tpm",
+        type=int,
+        default=DEFAULT_TPM,
+        help="Estimated tokens-per-minute budget (default: 0 = not tracked)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Athletes processed in parallel (default: 4); --rpm still caps the request rate",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -326,139 +770,253 @@ def main():
         default=True,
         help="Overwrite existing training program files (default: True)",
     )
+    parser.add_argument(
+        "--stream",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Stream replies and lay out the .docx while tokens arrive (default: on; --no-stream builds it afterwards in worker processes)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Skip athletes whose program .docx is newer than their Analysis.md (default: on; --no-incremental to rebuild all)",
+    )
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help=f"Reuse replies for identical model + prompt from {RESPONSE_CACHE} (default: on; --no-cache for fresh replies)",
+    )
+    parser.add_argument(
+        "--truncate-long-analysis",
+        action="store_true",
+        help=f"Send only the first {MAX_ANALYSIS_TOKENS} tokens of an over-long analysis instead of failing that athlete",
+    )
     args = parser.parse_args()
 
     base_dir = Path(args.base_dir)
-    model = args.model
-    rpm = max(1, args.rpm)
-    dry_run = args.dry_run
-    overwrite = args.overwrite
-
     if not base_dir.exists():
         raise SystemExit(f"Base directory not found: {base_dir}")
 
+    asyncio.run(
+        run_grok_generation_async(
+            api_key,
+            base_dir,
+            model=args.model,
+            rpm=max(1, args.rpm),
+            tpm=max(0, args.tpm),
+            concurrency=max(1, args.concurrency),
+            dry_run=args.dry_run,
+            overwrite=args.overwrite,
+            incremental=args.incremental,
+            stream=args.stream,
+            use_cache=args.cache,
+            truncate_long=args.truncate_long_analysis,
+        )
+    )
+
+
+def make_http_client(concurrency: int) -> httpx.AsyncClient:
+    """
+    One pooled client for the whole run: keep-alive connections skip a TCP+TLS handshake
+    per request, and HTTP/2 (when h2 is installed) multiplexes requests over one socket.
+    """
+    pool = max(32, concurrency * 2)
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=pool,
+            max_keepalive_connections=max(16, concurrency),
+        ),
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=10.0),
+    )
+
+
+async def run_grok_generation_async(
+    api_key: str,
+    base_dir: Path,
+    model: str,
+    rpm: int,
+    tpm: int,
+    concurrency: int,
+    dry_run: bool,
+    overwrite: bool,
+    incremental: bool = True,
+    stream: bool = True,
+    use_cache: bool = True,
+    truncate_long: bool = False,
+) -> None:
     # Set up OpenAI-compatible client for xAI
-    client = OpenAI(api_key=api_key, base_url="https://api.x.ai/v1")
+    # (client.close() below also closes the pooled http client)
+    client = AsyncOpenAI(
+        api_key=api_key,
+        base_url=XAI_BASE_URL,
+        http_client=make_http_client(concurrency),
+    )
 
     # Logs
     log_csv = base_dir / LOG_CSV
     fail_list = base_dir / FAIL_LIST
-    ensure_log_headers(log_csv)
+    sink = LogSink(log_csv, fail_list)
+    cache = ResponseCache(base_dir / RESPONSE_CACHE) if use_cache and not dry_run else None
+
+    # Rate limiter + concurrency cap
+    rl = AsyncRateLimiter(rpm=rpm, tpm=tpm)
+    sem = asyncio.Semaphore(concurrency)
 
-    # Rate limiter
-    rl = RateLimiter(rpm=rpm)
+    global DOCX_POOL
+    if not dry_run and not stream:
+        DOCX_POOL = ProcessPoolExecutor(max_workers=max(1, min(os.cpu_count() or 1, concurrency)))
 
-    # Discover teams & athletes
-    teams = list_team_dirs(base_dir)
+    # Discover teams & athletes (all paths resolved up front)
+    teams = plan(base_dir)
     total_teams = len(teams)
-    total_athletes = sum(len(list_athlete_dirs(t)) for t in teams)
+    total_athletes = sum(len(items) for _, items in teams)
 
     print(
         f"[{now_iso()}] Scanning base: {base_dir}\n"
         f" - Teams found: {total_teams}\n"
         f" - Athlete folders (all teams): {total_athletes}\n"
+        f" - Concurrency: {concurrency} | RPM: {rpm} | TPM: {tpm or 'untracked'}\n"
     )
 
-    # Process by team, then athlete
-    team_idx = 0
-    processed_count = 0
+    processed = {"count": 0}
+
+    async def handle_athlete(item: WorkItem):
+        athlete, athlete_dir, label = item.athlete, item.athlete_dir, item.label
+        out_file = item.out
+
+        if not item.analysis:
+            msg = f"SKIP - analysis file missing for {athlete}"
+            print(f"  {label}", msg)
+            sink.log(
+                [
+                    now_iso(),
+                    athlete,
+                    str(athlete_dir),
+                    "missing-analysis",
+                    model,
+                    "",
+                ],
+            )
+            sink.fail(athlete, "analysis file missing")
+            return
 
-    for team in teams:
-        team_idx += 1
-        athletes = list_athlete_dirs(team)
-        print(
-            f"[{now_iso()}] Team {team_idx}/{total_teams}: {team.name} — Athletes: {len(athletes)}"
-        )
+        if dry_run:
+            print(f"  {label} DRY RUN - would call Grok and write:", out_file.name)
+            sink.log(
+                [
+                    now_iso(),
+                    athlete,
+                    str(athlete_dir),
+                    "dry-run",
+                    model,
+                    out_file.name,
+                ],
+            )
+            return
 
-        for a_idx, athlete_dir in enumerate(athletes, start=1):
-            athlete = athlete_dir.name
-            # Show which team & athlete we're processing
-            print(f"  [{now_iso()}] ({a_idx}/{len(athletes)}) {team.name} → {athlete}")
-
-            analysis_file = find_analysis_file(athlete_dir, athlete)
-            out_file = athlete_dir / f"{athlete} 8 Weeks Training Program.docx"
-
-            if not analysis_file or not analysis_file.exists():
-                msg = f"SKIP - analysis file missing for {athlete}"
-                print("     ", msg)
-                append_log(
-                    log_csv,
-                    [
-                        now_iso(),
-                        athlete,
-                        str(athlete_dir),
-                        "missing-analysis",
-                        model,
-                        "",
-                    ],
-                )
-                append_fail(fail_list, athlete, "analysis file missing")
-                continue
-
-            if dry_run:
-                print("     DRY RUN - would call Grok and write:", out_file.name)
-                append_log(
-                    log_csv,
-                    [
-                        now_iso(),
-                        athlete,
-                        str(athlete_dir),
-                        "dry-run",
-                        model,
-                        out_file.name,
-                    ],
-                )
-                continue
-
-            if out_file.exists() and not overwrite:
-                print("     SKIP - output exists and overwrite=False:", out_file.name)
-                append_log(
-                    log_csv,
-                    [
-                        now_iso(),
-                        athlete,
-                        str(athlete_dir),
-                        "skipped-exists",
-                        model,
-                        out_file.name,
-                    ],
-                )
-                continue
+        if incremental and item.up_to_date:
+            print(f"  {label} SKIP - program is newer than the analysis:", out_file.name)
+            sink.log(
+                [
+                    now_iso(),
+                    athlete,
+                    str(athlete_dir),
+                    "skipped-up-to-date",
+                    model,
+                    out_file.name,
+                ],
+            )
+            return
+
+        if item.out_exists and not overwrite:
+            print(f"  {label} SKIP - output exists and overwrite=False:", out_file.name)
+            sink.log(
+                [
+                    now_iso(),
+                    athlete,
+                    str(athlete_dir),
+                    "skipped-exists",
+                    model,
+                    out_file.name,
+                ],
+            )
+            return
 
+        async with sem:
+            # Show which team & athlete we're processing
+            print(f"  [{now_iso()}] {label} started")
             try:
-                ok, msg = process_athlete_folder(
-                    client, model, team.name, athlete_dir, rl, overwrite=overwrite
+                ok, msg = await process_athlete_folder(
+                    client,
+                    model,
+                    item,
+                    rl,
+                    stream=stream,
+                    cache=cache,
+                    truncate_long=truncate_long,
                 )
                 if ok:
-                    print("     DONE ->", msg)
-                    append_log(
-                        log_csv,
+                    print(f"  {label} DONE ->", msg)
+                    sink.log(
                         [now_iso(), athlete, str(athlete_dir), "ok", model, msg],
                     )
                 else:
-                    print("     FAIL ->", msg)
-                    append_log(
-                        log_csv,
+                    print(f"  {label} FAIL ->", msg)
+                    sink.log(
                         [now_iso(), athlete, str(athlete_dir), "fail", model, ""],
                     )
-                    append_fail(fail_list, athlete, msg)
+                    sink.fail(athlete, msg)
             except Exception as e:
                 err = f"Unhandled error: {e}"
-                print("     ERROR ->", err)
-                append_log(
-                    log_csv, [now_iso(), athlete, str(athlete_dir), "error", model, ""]
+                print(f"  {label} ERROR ->", err)
+                sink.log(
+                    [now_iso(), athlete, str(athlete_dir), "error", model, ""]
                 )
-                append_fail(fail_list, athlete, err)
+                sink.fail(athlete, err)
 
-            processed_count += 1
+        processed["count"] += 1
 
-        # friendly spacing per team
-        print()
+    # Queue every athlete (team by team); latency overlaps up to `concurrency` calls
+    queued: List[WorkItem] = []
+    for team_idx, (team_name, items) in enumerate(teams, start=1):
+        print(
+            f"[{now_iso()}] Team {team_idx}/{total_teams}: {team_name} — Athletes: {len(items)}"
+        )
+        queued.extend(items)
+    print()
+
+    crashed = 0
+    try:
+        results = await asyncio.gather(
+            *(handle_athlete(item) for item in queued), return_exceptions=True
+        )
+        # handle_athlete logs its own failures; anything returned here escaped it
+        for item, res in zip(queued, results):
+            if isinstance(res, BaseException):
+                crashed += 1
+                print(f"  {item.label} CRASH -> {res!r}")
+                sink.log(
+                    [now_iso(), item.athlete, str(item.athlete_dir), "crash", model, ""]
+                )
+                sink.fail(item.athlete, f"Task crashed: {res!r}")
+    finally:
+        sink.close()
+        if cache is not None:
+            cache.save()
+        await client.close()
+        if DOCX_POOL is not None:
+            DOCX_POOL.shutdown()
+            DOCX_POOL = None
 
     print(
-        f"[{now_iso()}] All done. Teams: {total_teams} | Athletes visited: {total_athletes} | "
-        f"Processed attempts: {processed_count} | Log: {log_csv.name} | Fail list: {fail_list.name}"
+        f"\n[{now_iso()}] All done. Teams: {total_teams} | Athletes visited: {total_athletes} | "
+        f"Processed attempts: {processed['count']} | Log: {log_csv.name} | Fail list: {fail_list.name}"
     )
+    if crashed:
+        raise SystemExit(f"{crashed} athlete task(s) crashed; see CRASH lines above.")
 
 
 if __name__ == "__main__":
@@ -5,9 +5,18 @@ import time
 import subprocess
 import sys
 import hashlib
+import io
+import json
+import queue
+import threading
+import weakref
 from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import List, Optional, Set, Tuple
+from urllib.parse import urlsplit
 
 from dotenv import load_dotenv
 from playwright.sync_api import (
@@ -18,99 +27,234 @@ from playwright.sync_api import (
     Locator,
 )
 
+# Optional fast non-cryptographic hash for screenshot dedupe (pip install xxhash)
+try:
+    import xxhash
+except ImportError:  # fall back to hashlib
+    xxhash = None
+
+# Optional: crop accordion sections out of one viewport screenshot (pip install pillow)
+try:
+    from PIL import Image
+except ImportError:  # fall back to one element screenshot per section
+    Image = None
+
+# Per-athlete cleanup runs in-process when importable (falls back to the script)
+try:
+    from cleanup_vald_images import cleanup_athlete_dir
+except ImportError:
+    cleanup_athlete_dir = None
+
 # ===================== ENV / CONFIG =====================
 load_dotenv()  # .env in CWD
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
 EMAIL = os.getenv("EMAIL")
 PASSWORD = os.getenv("PASSWORD")
 if not EMAIL or not PASSWORD:
     raise RuntimeError("EMAIL/PASSWORD must be set in .env")
 
 BASE_URL = "https://hub.valdperformance.com/"
+PROFILES_URL = BASE_URL + "app/profiles"  # deep link: lands on the list without a click
 OUTPUT_DIR = Path(r"D:/Vald Data")
 AUTH_FILE = "auth_state.json"
+# Persistent Chromium profiles (HTTP cache survives between runs); one sub-folder per browser
+PROFILE_DIR = Path(".pw-profile")
+DISK_CACHE_BYTES = 256 * 1024 * 1024
+PROFILES_READY_SELECTOR = "tbody tr, .react-select__control"
 
 # ===================== TIMING TUNABLES =====================
+DEFAULT_TIMEOUT = 8000  # ms default for actions/expects; only widened where the page needs it
+NAV_TIMEOUT = 15000  # ms default for navigations / URL changes
 SHORT_PAUSE = 350  # ms settle pauses inside modals/tiles
-MENU_AFTER_SELECT = 900
-MODAL_MOUNT_WAIT = 800  # ms after modal reported visible
+MODAL_MOUNT_TIMEOUT = 10000  # max wait for a modal's first chart/accordion to render
+TILE_GRID_TIMEOUT = 20000  # max wait for the overview's tile set to stop changing
+TILE_GRID_QUIET_MS = 1500  # tile set unchanged this long -> every tile has rendered
 
 # More patient accordion discovery & settle timings
 ACCORDION_DISCOVERY_TIMEOUT = 30000  # wait up to 30s for accordions to appear
 ACCORDION_STABLE_FOR_MS = 1500  # require count to be stable this long
-ACCORDION_CHECK_INTERVAL = 250
-ACCORDION_SECTION_SETTLE_MS = 600  # settle each section before screenshot
+ACCORDION_SECTION_SETTLE_TIMEOUT = 4000  # max wait for a section's layout to stop moving
+ACCORDION_BODY_TIMEOUT = 4000  # max wait for ALL section charts to become visible
+CHART_POLL_INTERVAL = 50  # ms between in-page chart signature checks
+DUPE_CHANGE_TIMEOUT = 1000  # max wait for a chart to redraw after a duplicate screenshot
+# Capture every accordion section that fits on screen from ONE viewport screenshot (needs Pillow)
+CLIP_ACCORDIONS = _env_flag("VALD_CLIP_ACCORDIONS", True)
 
 # ===================== WINDOW / VIEWPORT =====================
 WINDOW_W = 1920
 WINDOW_H = 1080
 DEVICE_SCALE = 2  # 1=normal, 2=crisper element screenshots
-
-# Run headless to avoid interference. Set to False if you want to watch.
-HEADLESS = True
+# The main window only walks the team list (captures run in tabs/workers): render it smaller
+NAV_VIEWPORT = {"width": 1280, "height": 720}
+# HumanTrak dropdown tiles are small single charts: "css" saves them at 1x (1/4 of the pixels);
+# "device" keeps DEVICE_SCALE like the modal accordions
+TILE_SHOT_SCALE = "css"
+
+# Run headless to avoid interference. Set VALD_HEADLESS=0 if you want to watch.
+HEADLESS = _env_flag("VALD_HEADLESS", True)
+# VALD_DEBUG=1 slows every Playwright action down so you can follow along.
+# Production runs keep this off: slow_mo is applied after EVERY action.
+VALD_DEBUG = _env_flag("VALD_DEBUG", False)
+SLOW_MO_MS = 55 if VALD_DEBUG else 0
+
+# Athletes captured in parallel, each worker in its own browser + context (VALD_WORKERS=1 -> serial).
+# Capped by CPU count: every worker renders charts and encodes PNGs in its own Chromium.
+CAPTURE_WORKERS = max(
+    1, min(int(os.getenv("VALD_WORKERS", "4") or "4"), os.cpu_count() or 1)
+)
 
 # Extra Chrome args to avoid accidental zoom/gestures & nav gestures
 CHROME_ARGS = [
     f"--window-size={WINDOW_W},{WINDOW_H}",
     "--disable-pinch",
     "--overscroll-history-navigation=0",
+    # Background work a scraper never uses (updates, crash reports, translate, casting)
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-breakpad",
+    "--disable-features=TranslateUI,MediaRouter,BackForwardCache",
+    "--no-default-browser-check",
+    "--mute-audio",
+    "--disable-dev-shm-usage",  # Linux/containers: /dev/shm is tiny; no effect on Windows
+    # Keep timers/rAF at full speed in tabs that aren't in front (list page vs detail tab)
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
 ]
 
 
+# expect() assertions without an explicit timeout use the same default as actions
+expect.set_options(timeout=DEFAULT_TIMEOUT)
+
+
 # ===================== UTILS =====================
+_LOG_LOCK = threading.Lock()
+_WS_COLLAPSE = re.compile(r"\s+")
+_PROFILES_URL_RE = re.compile(r".*/app/profiles")
+_OVERVIEW_URL_RE = re.compile(r".*/overview")
+_HAS_DIGIT_RE = re.compile(r"\d")  # test profiles carry digits in their names
+# One C-level pass: newlines -> spaces, characters Windows rejects in file names dropped
+_FILENAME_TABLE = str.maketrans({"\n": " ", "\r": " ", **dict.fromkeys('\\/*?:"<>|')})
+
+
 def log(tag: str, msg: str) -> None:
-    print(f"{tag:<7}| {msg}")
+    with _LOG_LOCK:
+        print(f"{tag:<7}| {msg}")
 
 
+@lru_cache(maxsize=256)
 def sanitize_filename(name: str) -> str:
-    name = name.replace("\n", " ").replace("\r", " ")
-    name = re.sub(r'[\\/*?:"<>|]', "", name)
-    name = re.sub(r"\s+", " ", name)
-    return name.strip()
+    name = name.translate(_FILENAME_TABLE)
+    return _WS_COLLAPSE.sub(" ", name).strip()
 
 
 def move_mouse_off_view(page: Page) -> None:
     """Nudge the mouse to the top-left so hover tooltips disappear before screenshots."""
     try:
         page.mouse.move(0, 0)
-        page.wait_for_timeout(150)
+        # Clicks move the mouse, so the move itself stays; wait for the re-render
+        # (two frames) instead of a fixed 150 ms.
+        page.evaluate(
+            "() => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)))"
+        )
     except Exception:
         pass
 
 
-def reset_zoom(page: Page) -> None:
-    """Force Chromium zoom back to 100% (guards against pinch/ctrl+wheel)."""
+# page -> host its zoom was last reset on (weak: closed tabs drop out on their own)
+_zoom_reset_host: "weakref.WeakKeyDictionary[Page, str]" = weakref.WeakKeyDictionary()
+
+
+def reset_zoom(page: Page, force: bool = False) -> None:
+    """
+    Force Chromium zoom back to 100% (guards against pinch/ctrl+wheel).
+    Chromium keeps zoom per host, and the script itself never zooms with pinch disabled,
+    so only the first call per page and host does work unless `force` is set. The host
+    is read from page.url on every call, so no navigation can leave the check stale.
+    """
+    host = urlsplit(page.url).netloc
+    if not force and _zoom_reset_host.get(page) == host:
+        return
     try:
         page.keyboard.down("Control")
         page.keyboard.press("0")
         page.keyboard.up("Control")
-        page.wait_for_timeout(120)
+        # the zoom change is applied by the next paint (two frames), not after a fixed 120 ms
+        page.evaluate(
+            "() => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)))"
+        )
+        _zoom_reset_host[page] = host
     except Exception:
         pass
 
 
 def ensure_profiles_page(page: Page) -> None:
-    """Make sure we're on the Profiles list and the page is idle, with zoom reset."""
-    if "/app/profiles" not in page.url:
+    """
+    Make sure we're on the Profiles list and it has rendered, with zoom reset.
+    Cheap when already there: the URL and a non-waiting visibility check are read
+    fresh on every call (no cached flag a missed navigation could leave stale).
+    """
+    if "/app/profiles" in page.url:
         try:
-            page.locator('a[href="/app/profiles"]').click()
+            if page.locator(PROFILES_READY_SELECTOR).first.is_visible():
+                reset_zoom(page)  # no-op unless the host changed
+                return
         except Exception:
-            page.goto(BASE_URL)
+            pass
+    else:
+        try:
             page.locator('a[href="/app/profiles"]').click()
-    expect(page).to_have_url(re.compile(r".*/app/profiles"))
-    page.wait_for_load_state("networkidle", timeout=30000)
+        except Exception:
+            page.goto(PROFILES_URL)
+    expect(page).to_have_url(_PROFILES_URL_RE)
+    # networkidle rarely fires on this SPA (polling/analytics); wait for the list UI instead.
+    # The groups filter is there even when the table is empty.
+    try:
+        page.wait_for_selector(PROFILES_READY_SELECTOR, state="visible", timeout=20000)
+    except PlaywrightTimeoutError:
+        log("NAV", "Profiles list not visible after 20s; continuing.")
     reset_zoom(page)
 
 
+def session_is_valid(page: Page) -> bool:
+    """
+    Open the Profiles list with the saved session and report whether we landed logged in.
+    Returns as soon as either the Profiles link or the login form shows up; when logged
+    in, ensure_profiles_page() then only has to wait for the list (no extra navigation).
+    """
+    page.goto(PROFILES_URL)
+    profiles_link = page.locator('a[href="/app/profiles"]')
+    login_form = page.locator('input[name="username"]')
+    try:
+        expect(profiles_link.or_(login_form).first).to_be_visible(timeout=15000)
+    except Exception:
+        return False
+    return profiles_link.first.is_visible()
+
+
 def perform_login(page: Page) -> bool:
     log("LOGIN", "Navigating...")
     page.goto(BASE_URL)
 
+    # is_visible() never waits, so a late banner was missed. Let Playwright dismiss it
+    # whenever it shows up and blocks an action instead; no cost when it's absent.
+    cookie_button = page.locator("#rcc-confirm-button")
+
+    def _accept_cookies() -> None:
+        cookie_button.click()
+        log("LOGIN", "Cookie banner accepted.")
+
     try:
-        cookie_button = page.locator("#rcc-confirm-button")
-        if cookie_button.is_visible():
-            cookie_button.click()
-            log("LOGIN", "Cookie banner accepted.")
-    except PlaywrightTimeoutError:
+        page.add_locator_handler(cookie_button, _accept_cookies, times=1)
+    except Exception:
         pass
 
     try:
@@ -169,40 +313,47 @@ def tile_by_heading_fallback(page: Page, title_text: str) -> Locator:
     )
 
 
-def get_tile_heading_text(tile: Locator) -> str:
-    heading = tile.locator(".truncate.font-medium").first
-    return heading.inner_text().strip() if heading.count() else ""
+def pin_tile(tile: Locator, key: str) -> Locator:
+    """
+    Tag the element `tile` resolves to with data-vald-tile=<key> and return a locator on that
+    attribute. Every later action then resolves a plain attribute selector instead of
+    re-running the article:has(...)/filter query. If React re-mounts the tile the tag is
+    lost; call again with the original locator to re-pin. Returns `tile` if tagging fails.
+    """
+    try:
+        tile.evaluate("(el, key) => { el.dataset.valdTile = key; }", key)
+    except Exception:
+        return tile
+    return tile.page.locator(f'[data-vald-tile="{key}"]').first
 
 
 def find_smartspeed_tile_by_title(page: Page, desired_title: str) -> Locator:
     tiles = tiles_by_testid(page, "smartspeed-tile")
-    count = tiles.count()
-    if count == 0:
+    # All headings in one round-trip (whitespace-collapsed, lowercased)
+    headings: List[str] = tiles.evaluate_all(
+        """els => els.map(a => ((a.querySelector('.truncate.font-medium') || {}).innerText || '')
+            .replace(/\\s+/g, ' ').trim().toLowerCase())"""
+    )
+    if not headings:
         raise RuntimeError("No smartspeed tiles found.")
 
-    want = re.sub(r"\s+", " ", desired_title).strip().lower()
-    for i in range(count):
-        t = tiles.nth(i)
-        cur = re.sub(r"\s+", " ", get_tile_heading_text(t)).strip().lower()
-        if cur == want:
-            return t
+    want = _WS_COLLAPSE.sub(" ", desired_title).strip().lower()
+    for i, txt in enumerate(headings):
+        if txt == want:
+            return tiles.nth(i)
 
     # Heuristics
-    for i in range(count):
-        t = tiles.nth(i)
-        txt = get_tile_heading_text(t).lower()
+    for i, txt in enumerate(headings):
         if (
             "sprint" in txt
             and "5-0-5" not in txt
             and "505" not in txt
             and ("20" in txt or "yd" in txt)
         ):
-            return t
-    for i in range(count):
-        t = tiles.nth(i)
-        txt = get_tile_heading_text(t).lower()
+            return tiles.nth(i)
+    for i, txt in enumerate(headings):
         if "5-0-5" in txt or "505" in txt:
-            return t
+            return tiles.nth(i)
     return tiles.first
 
 
@@ -218,16 +369,29 @@ def _real_modal_locator(page: Page) -> Locator:
     ).first
 
 
-def open_modal_forcedecks_by_name(page: Page, name: str) -> Locator:
+def _wait_modal_mounted(modal: Locator) -> None:
+    """Wait for the modal's first chart/accordion to render (replaces a fixed mount sleep)."""
+    try:
+        expect(modal.locator("canvas, svg, div.accordion").first).to_be_visible(
+            timeout=MODAL_MOUNT_TIMEOUT
+        )
+    except Exception:
+        pass
+
+
+def open_modal_forcedecks_by_name(
+    page: Page, name: str, tile: Optional[Locator] = None
+) -> Locator:
+    """Open a ForceDecks tile's modal. Pass `tile` when the caller already confirmed it is visible."""
     log("MODAL", f"Open '{name}'...")
-    tile = tile_forcedecks_by_name(page, name)
-    expect(tile).to_be_visible(timeout=20000)
+    if tile is None:
+        tile = tile_forcedecks_by_name(page, name)
+        expect(tile).to_be_visible(timeout=20000)
     tile.scroll_into_view_if_needed()
     tile.click()
     modal = _real_modal_locator(page)
-    expect(modal).to_be_visible(timeout=30000)
-    page.wait_for_timeout(MODAL_MOUNT_WAIT)
-    reset_zoom(page)
+    expect(modal).to_be_visible(timeout=NAV_TIMEOUT)
+    _wait_modal_mounted(modal)
     log("MODAL", f"'{name}' visible.")
     return modal
 
@@ -261,8 +425,7 @@ def open_modal_by_testid(
         modal = _real_modal_locator(page)
         try:
             expect(modal).to_be_visible(timeout=3000)
-            page.wait_for_timeout(MODAL_MOUNT_WAIT)
-            reset_zoom(page)
+            _wait_modal_mounted(modal)
             log("MODAL", f"Opened via {label}.")
             return modal
         except Exception:
@@ -274,8 +437,7 @@ def open_modal_by_testid(
         page.keyboard.press("Enter")
         modal = _real_modal_locator(page)
         expect(modal).to_be_visible(timeout=3000)
-        page.wait_for_timeout(MODAL_MOUNT_WAIT)
-        reset_zoom(page)
+        _wait_modal_mounted(modal)
         log("MODAL", "Opened via Enter.")
         return modal
     except Exception:
@@ -294,29 +456,103 @@ def close_modal(page: Page, modal: Locator) -> None:
     else:
         page.mouse.click(10, 10)
     try:
-        expect(modal).not_to_be_visible(timeout=10000)
+        expect(modal).not_to_be_visible(timeout=DEFAULT_TIMEOUT)
         log("MODAL", "Closed.")
     except Exception:
         log("MODAL", "Close check timed-out; continuing.")
 
 
 # ===================== SCREENSHOTS & DEDUP =====================
-def _shot_bytes(locator: Locator) -> bytes:
-    """Return PNG bytes of the locator for hashing/write-after-unique."""
+def _shot_bytes(locator: Locator, scale: str = "device") -> bytes:
+    """
+    Return PNG bytes of the locator for hashing/write-after-unique.
+    animations="disabled" finishes CSS transitions before capture (no fixed settle sleep).
+    scale="css" captures at 1x regardless of DEVICE_SCALE (fewer bytes to encode and ship).
+    """
     locator.scroll_into_view_if_needed()
-    time.sleep(0.15)
-    return locator.screenshot()  # returns bytes
+    return locator.screenshot(animations="disabled", caret="hide", scale=scale)
+
+
+def _bytes_digest(data: bytes) -> int:
+    """64-bit digest of screenshot bytes: xxh3 when available, else BLAKE2b-64."""
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(data)
+    # blake2b with an 8-byte digest: faster than SHA-256 without SHA-NI, no truncation step
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+# PNG writes run in the background so the next screenshot isn't blocked on disk I/O.
+WRITE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="png-writer")
+_pending_writes = threading.local()  # per capture thread (main or worker)
+
+
+# O_SEQUENTIAL / O_BINARY only exist on Windows (the default D:/ target); 0 elsewhere
+_WRITE_FLAGS = (
+    os.O_WRONLY
+    | os.O_CREAT
+    | os.O_TRUNC
+    | getattr(os, "O_SEQUENTIAL", 0)
+    | getattr(os, "O_BINARY", 0)
+)
+
+
+def _fast_write(path: Path, data: bytes) -> None:
+    """Write bytes through a raw fd (no buffered file object / extra copy)."""
+    fd = os.open(str(path), _WRITE_FLAGS, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+    finally:
+        os.close(fd)
 
 
 def _write_png(path: Path, data: bytes) -> None:
-    path.write_bytes(data)
+    _queue_write(_fast_write, path, data)
+
+
+def _crop_to_png(path: Path, img, box: Tuple[int, int, int, int]) -> None:
+    """Cut `box` out of an already-decoded screenshot and write it as PNG (runs on WRITE_POOL)."""
+    buf = io.BytesIO()
+    img.crop(box).save(buf, format="PNG")
+    _fast_write(path, buf.getbuffer())
+
+
+def _queue_write(fn, *args) -> None:
+    fut = WRITE_POOL.submit(fn, *args)
+    if not hasattr(_pending_writes, "futures"):
+        _pending_writes.futures = []
+    _pending_writes.futures.append(fut)
+
+
+def take_png_writes() -> list:
+    """Hand over (and forget) the PNG write futures queued so far by this thread."""
+    futures = getattr(_pending_writes, "futures", [])
+    _pending_writes.futures = []
+    return futures
+
+
+def wait_png_writes(futures: list) -> bool:
+    """Block until the given PNG writes are on disk; log failed writes. True if all landed."""
+    wait_futures(futures)
+    ok = True
+    for fut in futures:
+        if fut.exception() is not None:
+            ok = False
+            log("SHOT", f"(warn) PNG write failed: {fut.exception()}")
+    return ok
+
+
+def flush_png_writes() -> None:
+    """Block until every PNG queued by this thread is on disk."""
+    wait_png_writes(take_png_writes())
 
 
 def screenshot_tile(
     tile: Locator, save_dir: Path, prefix: str, counters: defaultdict
 ) -> None:
     """Direct file write (used for modals & base shots)."""
-    expect(tile).to_be_visible(timeout=15000)
+    expect(tile).to_be_visible(timeout=DEFAULT_TIMEOUT)
     counters[prefix] += 1
     idx = counters[prefix]
     path = save_dir / f"{prefix}_{idx:03d}.png"
@@ -330,26 +566,41 @@ def screenshot_tile_unique(
     save_dir: Path,
     prefix: str,
     counters: defaultdict,
-    seen_hashes: set,
+    seen_hashes: Set[int],
     max_dupe_retries: int = 2,
+    seen_sigs: Optional[Set[str]] = None,
 ) -> bool:
     """
-    Capture a screenshot; if it duplicates a previous image for this tile prefix, retry a few times.
+    Capture a screenshot; if it duplicates a previously saved image, retry a few times.
     Returns True if a new file was written, False otherwise.
     """
+    if seen_sigs is None:
+        seen_sigs = set()
     for attempt in range(max_dupe_retries + 1):
-        data = _shot_bytes(tile)
-        digest = hashlib.sha256(data).hexdigest()
-        if digest in seen_hashes:
+        sig = _chart_signature(tile)
+        is_last = attempt == max_dupe_retries
+        data = b""
+        # A seen signature means the chart most likely hasn't changed yet: skip the
+        # screenshot and retry. New signatures (and the last attempt) go to the bytes hash.
+        if sig is not None and sig in seen_sigs and not is_last:
+            duplicate = True
+        else:
+            data = _shot_bytes(tile, scale=TILE_SHOT_SCALE)
+            digest = _bytes_digest(data)
+            duplicate = digest in seen_hashes
+        if duplicate:
             log(
                 "SHOT",
                 f"Duplicate detected for {prefix} (attempt {attempt+1}/{max_dupe_retries}); retrying...",
             )
-            # small jiggle/settle to encourage re-render stability
+            # small jiggle, then wait for the chart to actually redraw (not a fixed sleep)
             page = tile.page
             try:
                 tile.scroll_into_view_if_needed()
-                page.wait_for_timeout(250)
+                if sig is not None:
+                    _wait_for_chart_change(tile, sig)
+                else:
+                    page.wait_for_timeout(250)
                 move_mouse_off_view(page)
             except Exception:
                 pass
@@ -360,20 +611,65 @@ def screenshot_tile_unique(
         path = save_dir / f"{prefix}_{idx:03d}.png"
         _write_png(path, data)
         seen_hashes.add(digest)
+        if sig is not None:
+            seen_sigs.add(sig)
         log("SHOT", path.name)
         return True
     return False
 
 
 def _preload_modal_content(modal: Locator) -> None:
-    """Gently scroll the modal top->bottom to trigger lazy blocks, then back up."""
+    """
+    Step the modal down one visible height at a time to trigger lazy blocks, wait for their
+    charts, then scroll back up - all in one in-page call (a double rAF lands each paint).
+    """
     try:
-        modal.evaluate("e => { e.scrollTop = 0; }")
-        for y in (0.2, 0.4, 0.6, 0.8, 1.0):
-            modal.evaluate("(e, y) => e.scrollTo(0, e.scrollHeight * y)", y)
-            modal.page.wait_for_timeout(200)
-        modal.evaluate("e => { e.scrollTop = 0; }")
-        modal.page.wait_for_timeout(200)
+        modal.evaluate(
+            """async (e, timeoutMs) => {
+                const paint = () => new Promise(r =>
+                    requestAnimationFrame(() => requestAnimationFrame(r)));
+                // scrollHeight is re-read every step: lazy blocks grow the modal as we go
+                const step = Math.max(e.clientHeight, 1);
+                for (let y = step; y < e.scrollHeight + step; y += step) {
+                    e.scrollTo(0, y);
+                    await paint();
+                }
+                const deadline = performance.now() + timeoutMs;
+                const ready = () => [...e.querySelectorAll('div.accordion canvas, div.accordion svg')]
+                    .every(c => c.getBoundingClientRect().width > 0);
+                while (!ready() && performance.now() < deadline) await paint();
+                e.scrollTo(0, 0);
+                await paint();
+            }""",
+            ACCORDION_BODY_TIMEOUT,
+        )
+    except Exception:
+        try:
+            modal.evaluate("e => { e.scrollTop = 0; }")
+        except Exception:
+            pass
+
+
+def _wait_for_layout_stable(
+    locator: Locator, timeout_ms: int = ACCORDION_SECTION_SETTLE_TIMEOUT
+) -> None:
+    """Resolve once the element's bounding box is unchanged across two animation frames."""
+    try:
+        locator.evaluate(
+            """(el, timeoutMs) => new Promise(resolve => {
+                const deadline = performance.now() + timeoutMs;
+                let last = '';
+                const tick = () => {
+                    const r = el.getBoundingClientRect();
+                    const box = [r.x, r.y, r.width, r.height].join(',');
+                    if ((box === last && r.height > 0) || performance.now() >= deadline) return resolve();
+                    last = box;
+                    requestAnimationFrame(() => requestAnimationFrame(tick));
+                };
+                tick();
+            })""",
+            timeout_ms,
+        )
     except Exception:
         pass
 
@@ -382,24 +678,163 @@ def _wait_for_accordion_count_to_settle(
     modal: Locator,
     max_wait_ms: int = ACCORDION_DISCOVERY_TIMEOUT,
     stable_for_ms: int = ACCORDION_STABLE_FOR_MS,
-    interval_ms: int = ACCORDION_CHECK_INTERVAL,
 ) -> int:
-    """Wait until the number of div.accordion stops changing for `stable_for_ms`."""
-    elapsed = 0
-    stable = 0
-    prev = -1
-    while elapsed < max_wait_ms:
-        cnt = modal.locator("div.accordion").count()
-        if cnt == prev and cnt > 0:
-            stable += interval_ms
-            if stable >= stable_for_ms:
-                return cnt
-        else:
-            prev = cnt
-            stable = 0
-        modal.page.wait_for_timeout(interval_ms)
-        elapsed += interval_ms
-    return modal.locator("div.accordion").count()
+    """
+    Wait until the number of div.accordion stops changing for `stable_for_ms`.
+    Runs as one in-page promise: a MutationObserver re-arms a debounce timer on every
+    count change, so it resolves exactly `stable_for_ms` after the last change.
+    """
+    try:
+        return modal.evaluate(
+            """(m, [maxWait, stableFor]) => new Promise(resolve => {
+                const count = () => m.querySelectorAll('div.accordion').length;
+                let prev = -1, settle = null;
+                const finish = () => {
+                    obs.disconnect();
+                    clearTimeout(settle);
+                    clearTimeout(cap);
+                    resolve(count());
+                };
+                const check = () => {
+                    const n = count();
+                    if (n === prev) return;
+                    prev = n;
+                    clearTimeout(settle);
+                    if (n > 0) settle = setTimeout(finish, stableFor);  // 0 sections: keep waiting
+                };
+                const obs = new MutationObserver(check);
+                const cap = setTimeout(finish, maxWait);
+                obs.observe(m, { childList: true, subtree: true });
+                check();
+            })""",
+            [max_wait_ms, stable_for_ms],
+            timeout=max_wait_ms + 5000,
+        )
+    except Exception:
+        return modal.locator("div.accordion").count()
+
+
+_ACCORDION_BODY_SELECTOR = (
+    ".accordion-body, [data-testid='multiseries-chart'], svg, canvas, .recharts-wrapper"
+)
+
+
+def _wait_for_accordion_bodies(
+    modal: Locator, timeout_ms: int = ACCORDION_BODY_TIMEOUT
+) -> int:
+    """
+    One in-page wait (rAF loop) until every div.accordion has a visible chart/body.
+    Returns how many sections were still pending when the timeout hit (0 = all ready).
+    """
+    try:
+        return modal.evaluate(
+            """(m, [sel, timeoutMs]) => new Promise(resolve => {
+                const deadline = performance.now() + timeoutMs;
+                const tick = () => {
+                    const pending = [...m.querySelectorAll('div.accordion')].filter(a => {
+                        const b = a.querySelector(sel);
+                        return !(b && b.getClientRects().length);
+                    }).length;
+                    if (pending === 0 || performance.now() >= deadline) return resolve(pending);
+                    requestAnimationFrame(tick);
+                };
+                tick();
+            })""",
+            [_ACCORDION_BODY_SELECTOR, timeout_ms],
+        )
+    except Exception:
+        return -1
+
+
+# Scroll section `idx` to the top of its scroll box (idx < 0: stay put), then report the
+# viewport width, the visible box of the modal and every section's rect (viewport CSS px).
+_ACCORDION_LAYOUT_JS = """async (m, idx) => {
+    const paint = () => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+    const acc = [...m.querySelectorAll('div.accordion')];
+    if (idx >= 0 && acc[idx]) { acc[idx].scrollIntoView({ block: 'start' }); await paint(); }
+    let b = m.getBoundingClientRect();
+    let box = [Math.max(b.left, 0), Math.max(b.top, 0),
+               Math.min(b.right, innerWidth), Math.min(b.bottom, innerHeight)];
+    // The sections may scroll inside a child of the modal: clip to that container too
+    for (let el = acc.length ? acc[0].parentElement : null; el && el !== m; el = el.parentElement) {
+        const o = getComputedStyle(el).overflowY;
+        if (o === 'auto' || o === 'scroll') {
+            b = el.getBoundingClientRect();
+            box = [Math.max(box[0], b.left), Math.max(box[1], b.top),
+                   Math.min(box[2], b.right), Math.min(box[3], b.bottom)];
+            break;
+        }
+    }
+    return { vw: innerWidth, box, rects: acc.map(a => {
+        const r = a.getBoundingClientRect();
+        return [r.left, r.top, r.right, r.bottom];
+    }) };
+}"""
+
+
+def _screenshot_accordions_clipped(
+    page: Page, modal: Locator, total: int, save_dir: Path, prefix: str, counters: defaultdict
+) -> Tuple[int, int]:
+    """
+    Capture sections in order from viewport screenshots: scroll the next pending section to
+    the top, take ONE page screenshot, crop every following section that is fully visible.
+    A section taller than the visible box gets a regular element screenshot.
+    Returns (shots taken, index of the first section NOT handled) so callers can finish
+    the rest per element if something goes wrong.
+    """
+    took = 0
+    i = 0
+    scroll_to = -1  # first pass: sections already on screen after the preload
+    try:
+        while i < total:
+            layout = modal.evaluate(_ACCORDION_LAYOUT_JS, scroll_to)
+            rects = layout["rects"]
+            left, top, right, bottom = layout["box"]
+            shot = None
+            scale = 1.0
+            start = i
+            while i < min(total, len(rects)):
+                x0, y0, x1, y1 = rects[i]
+                if x1 - x0 <= 0 or y1 - y0 <= 0:
+                    log("SHOT", f"Skip accordion {i+1}: not rendered")
+                    i += 1
+                    continue
+                if not (
+                    x0 >= left - 0.5 and y0 >= top - 0.5 and x1 <= right + 0.5 and y1 <= bottom + 0.5
+                ):
+                    break
+                if shot is None:
+                    data = page.screenshot(animations="disabled", caret="hide")
+                    shot = Image.open(io.BytesIO(data))
+                    shot.load()  # decode once here; crops run on the writer threads
+                    scale = shot.width / layout["vw"]
+                box = (
+                    int(x0 * scale),
+                    int(y0 * scale),
+                    min(shot.width, int(round(x1 * scale))),
+                    min(shot.height, int(round(y1 * scale))),
+                )
+                counters[prefix] += 1
+                path = save_dir / f"{prefix}_{counters[prefix]:03d}.png"
+                _queue_write(_crop_to_png, path, shot, box)
+                log("SHOT", f"{path.name} (accordion {i+1}/{total})")
+                took += 1
+                i += 1
+            if i >= min(total, len(rects)):
+                break
+            if i == start and scroll_to == i:
+                # Already at the top and still doesn't fit: too tall for one viewport
+                section = modal.locator("div.accordion").nth(i)
+                counters[prefix] += 1
+                path = save_dir / f"{prefix}_{counters[prefix]:03d}.png"
+                _write_png(path, _shot_bytes(section))
+                log("SHOT", f"{path.name} (accordion {i+1}/{total})")
+                took += 1
+                i += 1
+            scroll_to = i
+    except Exception as e:
+        log("SHOT", f"(warn) Clipped capture stopped at accordion {i+1}: {e}")
+    return took, i
 
 
 def screenshot_modal_accordions(
@@ -418,25 +853,38 @@ def screenshot_modal_accordions(
     total = cnt
     log("MODAL", f"{prefix}: found {total} accordion sections (stable).")
 
+    pending = _wait_for_accordion_bodies(modal)
+    if pending > 0:
+        log("MODAL", f"{prefix}: {pending} section(s) not fully rendered; continuing.")
+
     try:
         page.mouse.move(5, 5)
     except Exception:
         pass
 
     took = 0
-    for i in range(total):
-        section = accordions.nth(i)
+    first = 0
+    if CLIP_ACCORDIONS and Image is not None:
+        took, first = _screenshot_accordions_clipped(
+            page, modal, total, save_dir, prefix, counters
+        )
+        if first >= total:
+            return took
+
+    # Build section/chart locators once up front; the loop only resolves them.
+    sections = [accordions.nth(i) for i in range(first, total)]
+    charts = [
+        sec.locator("canvas, svg, .recharts-wrapper").first for sec in sections
+    ]
+
+    for i, (section, chart) in enumerate(zip(sections, charts), start=first):
         try:
-            body = section.locator(
-                ".accordion-body, [data-testid='multiseries-chart'], svg, canvas, .recharts-wrapper"
-            ).first
+            section.scroll_into_view_if_needed()
             try:
-                expect(body).to_be_visible(timeout=4000)
+                expect(chart).to_be_visible(timeout=ACCORDION_SECTION_SETTLE_TIMEOUT)
             except Exception:
                 pass
-
-            section.scroll_into_view_if_needed()
-            page.wait_for_timeout(ACCORDION_SECTION_SETTLE_MS)
+            _wait_for_layout_stable(section)
 
             counters[prefix] += 1
             idx = counters[prefix]
@@ -452,6 +900,7 @@ def screenshot_modal_accordions(
 
 
 # ---------- HumanTrak dropdown helpers (robust & pixel-aware) ----------
+@lru_cache(maxsize=256)
 def short_token_for_label(label: str) -> str:
     """A short, unique substring we can reliably match in truncated UI text."""
     if "Ankle Dorsiflexion" in label:
@@ -463,35 +912,144 @@ def short_token_for_label(label: str) -> str:
     return label[:24]
 
 
+@lru_cache(maxsize=64)
+def _token_pattern(label: str) -> "re.Pattern[str]":
+    """Compiled case-insensitive matcher for the label's short token (built once per label)."""
+    return re.compile(re.escape(short_token_for_label(label)), re.I)
+
+
+@lru_cache(maxsize=64)
+def _option_pattern(label: str) -> "re.Pattern[str]":
+    """Compiled exact-match pattern for the label's menu item."""
+    return re.compile(rf"^{re.escape(label)}\s*$")
+
+
+# Chart node to fingerprint, in order of preference (canvas is common for HumanTrak)
+_CHART_NODE_SELECTORS = ("canvas", ".recharts-wrapper svg, svg", ".recharts-wrapper")
+
+
 def _get_chart_locator(tile: Locator) -> Locator:
-    """Prefer a specific chart node to fingerprint; fallback to tile."""
-    # Prefer canvas if present (common for HumanTrak)
-    canvas = tile.locator("canvas").first
-    if canvas.count() > 0:
-        return canvas
-    # Else an SVG inside a wrapper
-    svg = tile.locator(".recharts-wrapper svg, svg").first
-    if svg.count() > 0:
-        return svg
-    # Else the wrapper itself
-    wrapper = tile.locator(".recharts-wrapper").first
-    if wrapper.count() > 0:
-        return wrapper
-    # Fallback to entire tile
-    return tile
-
-
-def _fingerprint(locator: Locator) -> str:
-    """PNG bytes hash for pixel-level change detection."""
-    data = _shot_bytes(locator)
-    return hashlib.sha256(data).hexdigest()
+    """Prefer a specific chart node to fingerprint; fallback to tile. One round-trip."""
+    try:
+        kind = tile.evaluate(
+            "(t, sels) => sels.findIndex(s => t.querySelector(s))",
+            list(_CHART_NODE_SELECTORS),
+        )
+    except Exception:
+        kind = -1
+    if kind < 0:
+        return tile
+    return tile.locator(_CHART_NODE_SELECTORS[kind]).first
+
+
+def _fingerprint(locator: Locator) -> int:
+    """
+    Cheap pixel hash for change detection only (never saved): low-quality JPEG at CSS
+    scale with animations frozen, instead of a full DEVICE_SCALE PNG.
+    """
+    data = locator.screenshot(
+        type="jpeg", quality=60, scale="css", animations="disabled"
+    )
+    return _bytes_digest(data)
+
+
+# Cheap in-page chart signature (no screenshot / PNG encode over CDP):
+# canvas -> FNV hash of a 64x64 downsample; svg -> path-length profile; plus a text hash.
+_CHART_SIG_JS = """el => {
+    const fnv = (h, v) => Math.imul(h ^ v, 16777619) >>> 0;
+    let t = 2166136261;
+    const txt = el.innerText || '';
+    for (let i = 0; i < txt.length; i++) t = fnv(t, txt.charCodeAt(i));
+    const c = el.querySelector('canvas');
+    if (c && c.width && c.height) {
+        try {
+            const small = document.createElement('canvas');
+            small.width = 64; small.height = 64;
+            const ctx = small.getContext('2d');
+            ctx.drawImage(c, 0, 0, 64, 64);
+            const d = ctx.getImageData(0, 0, 64, 64).data;
+            let h = 2166136261;
+            for (let i = 0; i < d.length; i += 4) h = fnv(h, d[i] + d[i + 1] + d[i + 2]);
+            return 'c' + h + ':' + t;
+        } catch (e) { /* tainted or webgl canvas: fall through */ }
+    }
+    const s = el.querySelector('svg');
+    if (s) {
+        const paths = [...s.querySelectorAll('path')]
+            .map(p => (p.getAttribute('d') || '').length).join(',');
+        return 's' + s.outerHTML.length + ':' + paths + ':' + t;
+    }
+    return 't' + t;
+}"""
+
+# Resolve with the new signature once it differs from `prior` (null on timeout).
+# DOM mutations trigger a check at once; the interval catches canvas redraws, which don't mutate.
+_CHART_CHANGE_JS = (
+    """(el, [prior, timeoutMs]) => new Promise(resolve => {
+        const sig = """
+    + _CHART_SIG_JS
+    + """;
+        let mo, iv, to;
+        const done = v => { mo.disconnect(); clearInterval(iv); clearTimeout(to); resolve(v); };
+        const check = () => { const s = sig(el); if (s !== prior) done(s); };
+        mo = new MutationObserver(check);
+        mo.observe(el, { subtree: true, childList: true, attributes: true, characterData: true });
+        iv = setInterval(check, 100);
+        to = setTimeout(() => done(null), timeoutMs);
+        check();
+    })"""
+)
+
+
+def _chart_signature(locator: Locator) -> Optional[str]:
+    """Chart signature computed in the page (_CHART_SIG_JS). None if it could not be computed."""
+    try:
+        return locator.evaluate(_CHART_SIG_JS)
+    except Exception:
+        return None
+
+
+def _wait_for_chart_change(
+    tile: Locator, prior_sig: str, timeout_ms: int = DUPE_CHANGE_TIMEOUT
+) -> Optional[str]:
+    """
+    One in-page promise that returns as soon as the tile's chart signature moves away from
+    `prior_sig` (MutationObserver + light interval), instead of sleeping a fixed time.
+    Returns the new signature, or None on timeout/error.
+    """
+    try:
+        return tile.evaluate(_CHART_CHANGE_JS, [prior_sig, timeout_ms])
+    except Exception:
+        return None
+
+
+CHART_STAMP_SELECTOR = "[data-vald-stamp]"
+
+
+def _stamp_chart(tile: Locator) -> bool:
+    """
+    Tag the tile's current chart node with a data attribute. If the chart re-mounts
+    after a metric change the stamped node disappears, which is far cheaper to poll
+    than a pixel fingerprint. Returns False if there was nothing to stamp.
+    """
+    try:
+        return tile.evaluate(
+            """t => {
+                const w = t.querySelector('.recharts-wrapper, canvas, svg');
+                if (!w) return false;
+                w.dataset.valdStamp = String(Date.now());
+                return true;
+            }"""
+        )
+    except Exception:
+        return False
 
 
 def _open_metric_menu(tile: Locator, attempts: int = 4) -> Locator:
     """Open the tile's metric dropdown menu robustly and return the menu locator."""
     page = tile.page
     btn = tile.locator('[data-testid="metric-dropdown-button"]').first
-    expect(btn).to_be_visible(timeout=12000)
+    expect(btn).to_be_visible(timeout=DEFAULT_TIMEOUT)
     btn.scroll_into_view_if_needed()
 
     for _ in range(attempts):
@@ -517,25 +1075,28 @@ def _open_metric_menu(tile: Locator, attempts: int = 4) -> Locator:
 
 
 def select_metric_and_wait(
-    page: Page, tile: Locator, label: str, timeout_ms: int = 10000
+    page: Page, tile: Locator, label: str, timeout_ms: int = DEFAULT_TIMEOUT
 ) -> None:
     """
     Open the dropdown, click the exact label, then wait until BOTH:
       1) The button text contains the label's short token (handles truncation)
-      2) The chart PIXEL fingerprint changes (canvas/SVG safe)
+      2) The chart signature changes (in-page; pixel fingerprint as fallback)
     """
-    token = short_token_for_label(label)
+    btn = tile.locator('[data-testid="metric-dropdown-button"]').first
+    span = btn.locator("span.truncate").first
 
-    # Snapshot chart fingerprint BEFORE selection
-    chart_before = _get_chart_locator(tile)
-    fp_before = _fingerprint(chart_before)
+    # Snapshot chart signature BEFORE selection (pixel fingerprint only as fallback)
+    sig_before = _chart_signature(tile)
+    chart_locator = _get_chart_locator(tile) if sig_before is None else None
+    fp_before = _fingerprint(chart_locator) if chart_locator is not None else None
+    stamped = _stamp_chart(tile)
 
     # Open dropdown (robust)
     menu = _open_metric_menu(tile)
 
     # Click the exact option text
-    option = menu.get_by_role("menuitem", name=re.compile(rf"^{re.escape(label)}\s*$"))
-    expect(option.first).to_be_visible(timeout=8000)
+    option = menu.get_by_role("menuitem", name=_option_pattern(label))
+    expect(option.first).to_be_visible(timeout=DEFAULT_TIMEOUT)
     option.first.scroll_into_view_if_needed()
     option.first.click(force=True)
 
@@ -545,47 +1106,81 @@ def select_metric_and_wait(
     except Exception:
         pass
 
-    # 1) Verify button text reflects new selection (truncate-aware)
-    btn = tile.locator('[data-testid="metric-dropdown-button"]').first
-    span = btn.locator("span.truncate").first
+    # 1) Verify button text reflects new selection (truncate-aware).
+    # No second retry here: a slow button label still gets the chart-change wait below.
     try:
-        expect(span).to_contain_text(
-            re.compile(re.escape(token), re.I), timeout=timeout_ms
-        )
+        expect(span).to_contain_text(_token_pattern(label), timeout=timeout_ms)
     except Exception:
-        # give the UI another small beat then re-check
-        page.wait_for_timeout(800)
-        expect(span).to_contain_text(re.compile(re.escape(token), re.I), timeout=3000)
+        log("CARD", f"(warn) Button text did not show '{label}' yet; waiting on chart.")
 
-    # 2) Wait for chart pixel fingerprint to change (canvas/SVG aware)
+    # 2) Wait for the chart to re-mount (stamp gone) or its pixels to change
     deadline = time.time() + (timeout_ms / 1000.0)
+    stamp = tile.locator(CHART_STAMP_SELECTOR)
     while time.time() < deadline:
-        chart_after = _get_chart_locator(tile)  # re-query in case of re-render
+        # Cheap check first: stamped node gone -> chart was re-mounted
         try:
-            fp_after = _fingerprint(chart_after)
-            if fp_after != fp_before:
+            if stamped and stamp.count() == 0:
                 break
         except Exception:
             pass
-        page.wait_for_timeout(150)
+        try:
+            if sig_before is not None:
+                if _chart_signature(tile) != sig_before:
+                    break
+            elif _fingerprint(chart_locator) != fp_before:
+                break
+        except Exception:
+            pass
+        page.wait_for_timeout(CHART_POLL_INTERVAL)
+
 
-    # small final settle
-    page.wait_for_timeout(MENU_AFTER_SELECT)
+# Shrink the tile by 1px for two frames, then restore it and fire a window resize:
+# the chart's ResizeObserver / resize listener redraws from its current props.
+_REPAINT_KICK_JS = """async t => {
+    const paint = () => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+    const prev = t.style.width;
+    t.style.width = (t.getBoundingClientRect().width - 1) + 'px';
+    await paint();
+    t.style.width = prev;
+    window.dispatchEvent(new Event('resize'));
+    await paint();
+}"""
+
+
+def repaint_chart(tile: Locator) -> bool:
+    """
+    Cheap in-page redraw of a sticky chart (no dropdown round-trip).
+    True if the chart signature changed afterwards.
+    """
+    sig = _chart_signature(tile)
+    if sig is None:
+        return False
+    try:
+        tile.evaluate(_REPAINT_KICK_JS)
+    except Exception:
+        return False
+    return _wait_for_chart_change(tile, sig) is not None
 
 
 def bounce_then_reselect(
     page: Page, tile: Locator, desired_label: str, alternatives: List[str]
 ) -> None:
-    """To break sticky renders, switch to an alternative metric briefly, then back to desired."""
+    """
+    Break a sticky render. Try a repaint kick first; only if the chart stays the same,
+    switch to an alternative metric briefly, then back to desired.
+    """
+    if repaint_chart(tile):
+        log("CARD", "Chart redrew after a repaint kick; no metric bounce needed.")
+        return
     alt = next((x for x in alternatives if x != desired_label), None)
     if not alt:
         return
     try:
         select_metric_and_wait(page, tile, alt)
-        page.wait_for_timeout(400)
+        _wait_for_layout_stable(tile)
     except Exception:
         pass
-    select_metric_and_wait(page, desired_label)
+    select_metric_and_wait(page, tile, desired_label)
 
 
 def capture_humantrak_card(
@@ -595,51 +1190,69 @@ def capture_humantrak_card(
     save_dir: Path,
     counters: defaultdict,
     include_base: bool = False,  # False -> exactly one shot per label
+    seen_hashes: Optional[Set[int]] = None,
+    seen_sigs: Optional[Set[str]] = None,
 ) -> int:
     """
     Take exactly one screenshot per requested metric label (and optionally one base shot).
     Uses robust selection + pixel fingerprinting + bytes hashing + bounce strategy
     to avoid duplicates when the list reorders itself or re-renders slowly.
+    Pass the same seen_hashes/seen_sigs for every card of an athlete to catch
+    duplicates across cards too.
     """
-    tile = tile_humantrak_by_title(page, title)
-    if tile.count() == 0 or not tile.is_visible():
-        tile = tile_by_heading_fallback(page, title)
-    expect(tile).to_be_visible(timeout=15000)
+    tile_query = tile_humantrak_by_title(page, title)
+    if tile_query.count() == 0 or not tile_query.is_visible():
+        tile_query = tile_by_heading_fallback(page, title)
+    expect(tile_query).to_be_visible(timeout=DEFAULT_TIMEOUT)
 
     taken = 0
-    seen_hashes: set = set()
+    if seen_hashes is None:
+        seen_hashes = set()
+    if seen_sigs is None:
+        seen_sigs = set()
     prefix = title.replace(" ", "_")
+    # Resolve the tile query once; the metric loop works on the tagged element
+    tile = pin_tile(tile_query, prefix)
 
     if include_base:
         log("CARD", f"{title}: base screenshot")
         move_mouse_off_view(page)
-        if screenshot_tile_unique(tile, save_dir, prefix, counters, seen_hashes):
+        if screenshot_tile_unique(
+            tile, save_dir, prefix, counters, seen_hashes, seen_sigs=seen_sigs
+        ):
             taken += 1
 
     for label in labels_to_capture:
         success = False
+        need_select = True  # after a bounce the desired metric is already showing
         for attempt in range(1, 4):
             try:
-                log("CARD", f"{title}: selecting '{label}' (attempt {attempt}/3)")
-                select_metric_and_wait(page, tile, label)
+                if need_select:
+                    log("CARD", f"{title}: selecting '{label}' (attempt {attempt}/3)")
+                    select_metric_and_wait(page, tile, label)
+                else:
+                    log("CARD", f"{title}: re-capturing '{label}' (attempt {attempt}/3)")
+                need_select = True
                 move_mouse_off_view(page)
                 if screenshot_tile_unique(
-                    tile, save_dir, prefix, counters, seen_hashes
+                    tile, save_dir, prefix, counters, seen_hashes, seen_sigs=seen_sigs
                 ):
                     success = True
                     taken += 1
                     break
                 else:
-                    # If duplicate bytes, try bouncing to another metric and back
+                    # If duplicate bytes, kick a repaint (or bounce via another metric)
                     log(
                         "CARD",
-                        f"{title}: duplicate after select, bouncing via alt metric...",
+                        f"{title}: duplicate after select, forcing a redraw...",
                     )
                     bounce_then_reselect(page, tile, label, labels_to_capture)
+                    need_select = False
                     move_mouse_off_view(page)
             except Exception as e:
                 log("CARD", f"(retry) '{title}' -> '{label}' failed: {e}")
                 page.wait_for_timeout(600)
+                tile = pin_tile(tile_query, prefix)  # re-tag in case the tile re-mounted
 
         if not success:
             log(
@@ -652,47 +1265,146 @@ def capture_humantrak_card(
 
 
 # ===================== PER-ATHLETE FLOW =====================
-def take_screens_for_athlete(page: Page, out_dir: Path, athlete_name: str) -> None:
+# Accordion-modal tiles: (display name, file prefix, tile testid, smartspeed title hint)
+MODAL_TILES: List[Tuple[str, str, str, Optional[str]]] = [
+    ("Countermovement Jump", "Countermovement_Jump", "forcedecks-tile", None),
+    ("Nordic", "Nordic", "nordbord-tile", None),
+    ("20yd Sprint", "20yd_Sprint", "smartspeed-tile", "20yd Sprint"),
+    ("5-0-5 Drill", "5-0-5_Drill", "smartspeed-tile", "5-0-5 Drill"),
+]
+HUMANTRAK_TITLES = ("Overhead Squat", "Lunge")
+
+
+def _wait_for_tile_grid_settle(
+    page: Page,
+    max_wait_ms: int = TILE_GRID_TIMEOUT,
+    quiet_ms: int = TILE_GRID_QUIET_MS,
+) -> None:
+    """
+    Wait until the overview's tiles (test ids + headings) stop changing for `quiet_ms`,
+    so a slow tile is in the DOM before probe_overview_tiles() decides what is present.
+    Same MutationObserver + debounce pattern as _wait_for_accordion_count_to_settle.
+    """
+    try:
+        page.evaluate(
+            """([maxWait, quiet]) => new Promise(resolve => {
+                const key = () => [...document.querySelectorAll(
+                    'article [data-testid$="-tile"], article .truncate.font-medium')]
+                    .map(e => e.getAttribute('data-testid') || e.innerText).join('|');
+                let prev = null, settle = null;
+                const finish = () => {
+                    obs.disconnect();
+                    clearTimeout(settle);
+                    clearTimeout(cap);
+                    resolve();
+                };
+                const check = () => {
+                    const k = key();
+                    if (k === prev) return;
+                    prev = k;
+                    clearTimeout(settle);
+                    if (k) settle = setTimeout(finish, quiet);  // no tiles yet: keep waiting
+                };
+                const obs = new MutationObserver(check);
+                const cap = setTimeout(finish, maxWait);
+                obs.observe(document.body, { childList: true, subtree: true });
+                check();
+            })""",
+            [max_wait_ms, quiet_ms],
+            timeout=max_wait_ms + 5000,
+        )
+    except Exception:
+        pass
+
+
+def probe_overview_tiles(page: Page) -> dict:
+    """
+    One JS call that reports which tiles exist on the athlete overview, so absent
+    tiles can be skipped instead of each one running into a 20s visibility timeout.
+    """
+    return page.evaluate(
+        """() => ({
+            testids: [...new Set([...document.querySelectorAll('article [data-testid$="-tile"]')]
+                .map(e => e.getAttribute('data-testid')))],
+            forcedecks: [...document.querySelectorAll('[data-testid="forcedecks-tile"]')]
+                .map(e => e.getAttribute('data-test-name')),
+            headings: [...document.querySelectorAll('article .truncate.font-medium')]
+                .map(e => (e.innerText || '').trim().toLowerCase()),
+        })"""
+    )
+
+
+def take_screens_for_athlete(
+    page: Page, out_dir: Path, athlete_name: str
+) -> Tuple[int, int]:
+    """
+    Capture every known tile on the overview. Returns (shots saved, tiles failed);
+    a tile that raised or came back with fewer shots than expected counts as failed.
+    """
     reset_zoom(page)
     log("FLOW", f"Capturing for athlete: {athlete_name}")
     save_dir = Path(out_dir)
-    save_dir.mkdir(parents=True, exist_ok=True)
+    save_dir.mkdir(exist_ok=True)  # team folder is created once per team by main()
     counters: defaultdict = defaultdict(int)
 
+    # Reuse the located CMJ tile in its opener instead of waiting for it twice.
+    cmj_tile: Optional[Locator] = tile_forcedecks_by_name(page, "Countermovement Jump")
     try:
-        expect(tile_forcedecks_by_name(page, "Countermovement Jump")).to_be_visible(
-            timeout=20000
-        )
+        expect(cmj_tile).to_be_visible(timeout=20000)
+        _wait_for_layout_stable(cmj_tile)  # tiles stop shifting as the grid fills in
     except Exception:
+        cmj_tile = None
         log("FLOW", "CMJ tile not found immediately; proceeding anyway.")
-    page.wait_for_timeout(300)
+
+    # The probe is a single snapshot: let late tiles render first or they'd count as absent
+    _wait_for_tile_grid_settle(page)
+    try:
+        present = probe_overview_tiles(page)
+    except Exception as e:
+        log("FLOW", f"(warn) Tile probe failed ({e}); trying every tile.")
+        present = None
+
+    def has_tile(name: str, testid: str) -> bool:
+        if present is None:
+            return True
+        if testid == "forcedecks-tile":
+            return name in present["forcedecks"]
+        return testid in present["testids"]
+
+    def has_heading(title: str) -> bool:
+        if present is None:
+            return True
+        return any(title.lower() in h for h in present["headings"])
+
+    modal_tiles = [t for t in MODAL_TILES if has_tile(t[0], t[2])]
+    ht_titles = [t for t in HUMANTRAK_TITLES if has_heading(t)]
+    if not modal_tiles and not ht_titles:
+        log("FLOW", "No known tiles on this overview; nothing to capture.")
+        return 0, 0
+    failed = 0
 
     # ---------- Modal tiles (accordion-based) ----------
-    for label, opener in [
-        (
-            "Countermovement_Jump",
-            lambda: open_modal_forcedecks_by_name(page, "Countermovement Jump"),
-        ),
-        ("Nordic", lambda: open_modal_by_testid(page, "nordbord-tile")),
-        (
-            "20yd_Sprint",
-            lambda: open_modal_by_testid(page, "smartspeed-tile", "20yd Sprint"),
-        ),
-        (
-            "5-0-5_Drill",
-            lambda: open_modal_by_testid(page, "smartspeed-tile", "5-0-5 Drill"),
-        ),
-    ]:
+    for name, prefix, testid, title_hint in MODAL_TILES:
+        if (name, prefix, testid, title_hint) not in modal_tiles:
+            log("FLOW", f"(skip) {name} tile not on this overview.")
+            continue
         try:
-            log("FLOW", f"Modal tile: {label.replace('_',' ')}")
-            modal = opener()
+            log("FLOW", f"Modal tile: {name}")
+            if testid == "forcedecks-tile":
+                known_tile = cmj_tile if prefix == "Countermovement_Jump" else None
+                modal = open_modal_forcedecks_by_name(page, name, tile=known_tile)
+            else:
+                modal = open_modal_by_testid(page, testid, title_hint)
             count = screenshot_modal_accordions(
-                page, modal, save_dir, prefix=label, counters=counters
+                page, modal, save_dir, prefix=prefix, counters=counters
             )
             close_modal(page, modal)
-            log("FLOW", f"✓ {label.replace('_',' ')} done ({count} shots)")
+            if count == 0:
+                raise RuntimeError("no accordion shots taken")
+            log("FLOW", f"✓ {name} done ({count} shots)")
         except Exception as e:
-            log("FLOW", f"(warn) {label.replace('_',' ')} failed: {e}")
+            failed += 1
+            log("FLOW", f"(warn) {name} failed: {e}")
 
     # ---------- HumanTrak tiles (dropdowns) ----------
     ht_labels = [
@@ -700,22 +1412,41 @@ def take_screens_for_athlete(page: Page, out_dir: Path, athlete_name: str) -> No
         "Avg Hip Adduction at Peak Knee Flexion - Left & Right",
         "Avg Ankle Dorsiflexion at Peak Knee Flexion - Left & Right",
     ]
-    try:
-        capture_humantrak_card(
-            page, "Overhead Squat", ht_labels, save_dir, counters, include_base=False
-        )
-    except Exception as e:
-        log("FLOW", f"(warn) Overhead Squat failed: {e}")
-
-    try:
-        capture_humantrak_card(
-            page, "Lunge", ht_labels, save_dir, counters, include_base=False
-        )
-    except Exception as e:
-        log("FLOW", f"(warn) Lunge failed: {e}")
+    seen_hashes: Set[int] = set()  # shared across cards -> cross-card dedupe
+    seen_sigs: Set[str] = set()
+    for title in HUMANTRAK_TITLES:
+        if title not in ht_titles:
+            log("FLOW", f"(skip) {title} tile not on this overview.")
+            continue
+        try:
+            taken = capture_humantrak_card(
+                page,
+                title,
+                ht_labels,
+                save_dir,
+                counters,
+                include_base=False,
+                seen_hashes=seen_hashes,
+                seen_sigs=seen_sigs,
+            )
+            if taken < len(ht_labels):
+                raise RuntimeError(f"{taken}/{len(ht_labels)} metrics captured")
+        except Exception as e:
+            failed += 1
+            log("FLOW", f"(warn) {title} failed: {e}")
 
+    # PNG writes keep flushing in the background; start_athlete_cleanup waits for them
     total = sum(counters.values())
-    log("FLOW", f"Athlete '{athlete_name}' complete. Total images: {total}")
+    log(
+        "FLOW",
+        f"Athlete '{athlete_name}' complete. Total images: {total}, failed tiles: {failed}",
+    )
+    return total, failed
+
+
+def capture_is_complete(saved: int, failed: int) -> bool:
+    """Record only captures with shots and no failed tile; the next run retries the rest."""
+    return saved > 0 and failed == 0
 
 
 # ===================== TEAM SELECTION HELPERS =====================
@@ -723,12 +1454,15 @@ def open_groups_dropdown(page: Page) -> None:
     """Robustly open the Groups react-select dropdown (no fragile 'All Groups' text match)."""
     # Ensure we're on profiles and scrolled to top
     ensure_profiles_page(page)
-    page.evaluate("window.scrollTo(0,0)")
-    page.wait_for_timeout(100)
+    page.evaluate("window.scrollTo(0,0)")  # synchronous: no settle pause needed
 
     control = page.locator(".react-select__control").first
     expect(control).to_be_visible(timeout=15000)
 
+    # Still open from resolve_teams_by_prefix / a previous step: clicking would close it
+    if page.locator(".react-select__menu").is_visible():
+        return
+
     attempts = 0
     while attempts < 4:
         try:
@@ -746,52 +1480,66 @@ def open_groups_dropdown(page: Page) -> None:
     expect(page.locator(".react-select__menu")).to_be_visible(timeout=3000)
 
 
-def clear_all_selected_groups(page: Page) -> None:
-    """If chips are present, remove them so only one team is selected for filtering."""
+def clear_all_selected_groups(page: Page) -> bool:
+    """
+    If chips are present, remove them so only one team is selected for filtering.
+    Returns True if any chip was removed (the table then reloads).
+    """
     control = page.locator(".react-select__control").first
+    remove_btns = control.locator(".react-select__multi-value__remove")
+    removed = False
     try:
-        # Remove all 'x' chips if present
-        while True:
-            remove_btns = control.locator(".react-select__multi-value__remove")
-            if remove_btns.count() == 0:
-                break
+        # Remove all 'x' chips if present; each click waits for its chip to go, not a fixed pause
+        remaining = remove_btns.count()
+        for _ in range(remaining):
             remove_btns.first.click()
-            page.wait_for_timeout(120)
+            removed = True
+            remaining -= 1
+            try:
+                expect(remove_btns).to_have_count(remaining, timeout=2000)
+            except Exception:
+                remaining = remove_btns.count()
+            if remaining == 0:
+                break
     except Exception:
         pass
+    return removed
 
 
 def list_all_group_options(page: Page) -> List[str]:
     """Return visible option texts currently shown in the open dropdown."""
     options = page.locator(".react-select__menu .react-select__option")
-    count = options.count()
-    texts = []
-    for i in range(count):
-        try:
-            txt = options.nth(i).inner_text().strip()
-            if txt:
-                texts.append(txt)
-        except Exception:
-            pass
-    return texts
+    try:
+        return [t.strip() for t in options.all_inner_texts() if t.strip()]
+    except Exception:
+        return []
+
+
+@lru_cache(maxsize=256)
+def _group_option_pattern(label: str) -> "re.Pattern[str]":
+    """Compiled exact-match pattern for a Groups dropdown option (built once per team)."""
+    return re.compile(rf"^{re.escape(label)}$")
 
 
 def select_group_option_exact(page: Page, label: str) -> None:
     """Select a single option by exact visible label from the open dropdown."""
     options = page.locator(".react-select__menu .react-select__option")
-    target = options.filter(has_text=re.compile(rf"^{re.escape(label)}$"))
+    target = options.filter(has_text=_group_option_pattern(label))
     if target.count() == 0:
-        count = options.count()
-        for i in range(count):
-            o = options.nth(i)
-            try:
-                if o.inner_text().strip() == label:
-                    o.scroll_into_view_if_needed()
-                    o.click()
-                    return
-            except Exception:
-                pass
-        raise RuntimeError(f"Option not found: {label}")
+        # Index of the exact (trimmed) label in one round-trip, not an inner_text() per option
+        try:
+            idx = options.evaluate_all(
+                "(els, label) => els.findIndex(e => (e.innerText || '').trim() === label)",
+                label,
+            )
+        except Exception:
+            idx = -1
+        if idx < 0:
+            raise RuntimeError(f"Option not found: {label}")
+        o = options.nth(idx)
+        o.scroll_into_view_if_needed()
+        o.click()
+        return
     target.first.scroll_into_view_if_needed()
     target.first.click()
 
@@ -844,22 +1592,162 @@ def resolve_teams_by_prefix(page: Page, prefix: str) -> List[str]:
     return matched
 
 
+# Whole table page + pagination label ("1-25 of 140"): two pages or filters that merely
+# share a first row still differ here
+_TABLE_SIG_JS = """() => {
+    const body = document.querySelector('tbody');
+    const pager = document.querySelector(
+        '[class*="TablePagination-displayedRows"], [class*="TablePagination-caption"]');
+    return (pager ? pager.innerText : '') + '\\n'
+        + (body ? body.rows.length + '\\n' + body.innerText : '');
+}"""
+
+
+def table_signature(page: Page) -> str:
+    """Signature of the rendered profiles table ('' if it can't be read)."""
+    try:
+        return page.evaluate(_TABLE_SIG_JS)
+    except Exception:
+        return ""
+
+
+def snapshot_rows(page: Page) -> List[dict]:
+    """
+    All profile rows of the current table page in one call:
+    [{"name": <2nd cell text>, "has_initials": bool, "href": <absolute link or None>}, ...]
+    in row order. `href` lets callers open the overview without leaving the list.
+    """
+    return page.evaluate(
+        """() => [...document.querySelectorAll('tbody tr')].map(tr => {
+            const a = tr.querySelector('a[href*="/overview"]') || tr.querySelector('a[href]');
+            return {
+                name: ((tr.children[1] || {}).innerText || '').trim(),
+                has_initials: !!tr.querySelector('[aria-label="table-cell-initials"]'),
+                href: a ? a.href : null,
+            };
+        })"""
+    )
+
+
+def click_next_page(page: Page) -> Optional[str]:
+    """
+    Click the table's "next page" button without waiting for the new rows.
+    Returns the old table_signature() for wait_for_table_refresh(), or None on the last page.
+    """
+    next_btn = page.locator('button[aria-label="next page"]')
+    if not next_btn.is_enabled():
+        return None
+    prev_sig = table_signature(page)
+    next_btn.click()
+    return prev_sig
+
+
+def pick_new_rows(snapshot: List[dict], processed: Set[str]) -> dict:
+    """
+    One pass over a snapshot_rows() result: drop rows without a name/initials, test profiles
+    (digits in the name) and athletes already processed, and dedupe by folder name.
+    Returns {safe folder name: (row index, row)} in table order.
+    """
+    targets: dict = {}
+    for i, row in enumerate(snapshot):
+        name = row["name"]
+        if not name or not row["has_initials"]:
+            continue
+        if _HAS_DIGIT_RE.search(name):
+            log("TABLE", f"Skip test profile: {name}")
+            continue
+        safe = sanitize_filename(name)
+        if safe in processed:
+            log("TABLE", f"Skip already processed: {safe}")
+            continue
+        targets.setdefault(safe, (i, row))
+    return targets
+
+
+def wait_for_table_refresh(
+    page: Page, prev_sig: str, timeout_ms: int = 5000, settle_ms: int = 0
+) -> bool:
+    """
+    Wait until table_signature() differs from `prev_sig` (new data rendered) and, with
+    `settle_ms`, has then stayed the same that long (skips intermediate renders).
+    Explicit DOM condition instead of networkidle. Returns False on timeout: the table
+    still shows the old rows, so callers must not read it as the new page/filter.
+    """
+    try:
+        page.wait_for_function(
+            """([prev, settleMs]) => {
+                const cur = ("""
+            + _TABLE_SIG_JS
+            + """)();
+                const st = window.__valdTableWait || (window.__valdTableWait = {});
+                const now = performance.now();
+                if (cur === prev) { st.text = null; return false; }
+                if (st.text !== cur) { st.text = cur; st.since = now; }
+                return now - st.since >= settleMs;
+            }""",
+            arg=[prev_sig, settle_ms],
+            timeout=timeout_ms,
+            polling=100,
+        )
+        return True
+    except Exception:
+        return False
+    finally:
+        try:
+            page.evaluate("() => { delete window.__valdTableWait; }")
+        except Exception:
+            pass
+
+
+def filter_group_options(page: Page, text: str) -> None:
+    """
+    Narrow the open react-select menu to options matching `text`.
+    fill() sets the value in one step (no per-key typing delay) and fires the input
+    event react-select listens to; fill("") clears it again.
+    """
+    box = page.locator(".react-select__control input").first
+    try:
+        box.fill(text)
+    except Exception:
+        pass
+
+
 def set_filter_to_single_team(page: Page, team_name: str) -> None:
-    """Clear previous selections and set the filter to exactly one team."""
+    """
+    Clear previous selections and set the filter to exactly one team.
+    Raises RuntimeError when the table never shows the filtered rows.
+    """
     log("FILTER", f"Setting filter to single team: {team_name}")
-    clear_all_selected_groups(page)
+    prev_sig = table_signature(page)
+    if clear_all_selected_groups(page) and not wait_for_table_refresh(page, prev_sig):
+        log("FILTER", "(warn) Table did not refresh after clearing old chips.")
+    # Baseline = the cleared list, so its late render can't pass for this team's rows
+    prev_sig = table_signature(page)
     open_groups_dropdown(page)
-    select_group_option_exact(page, team_name)
+    filter_group_options(page, team_name)
+    try:
+        select_group_option_exact(page, team_name)
+    except RuntimeError:
+        # Filtering can hide the option on some builds: clear it and scan the full list
+        filter_group_options(page, "")
+        select_group_option_exact(page, team_name)
     page.locator("body").click(position={"x": 5, "y": 5})
-    page.wait_for_load_state("networkidle")
-    reset_zoom(page)
+    try:
+        expect(page.locator(".react-select__control").first).to_contain_text(
+            team_name, timeout=5000
+        )
+    except Exception:
+        pass
+    if not wait_for_table_refresh(page, prev_sig, settle_ms=400):
+        raise RuntimeError(f"Table did not refresh after filtering to '{team_name}'.")
 
 
 # --- NEW: click the react-select “×” to clear the current team after finishing a team ---
 def clear_selected_team_via_cross(page: Page) -> None:
     """
     Click the react-select clear indicator (×) to clear current selection.
-    Works for both single- and multi-select variants.
+    Works for both single- and multi-select variants. Waits for the unfiltered list
+    to render, so the next team's filter starts from a table that no longer changes.
     """
     ensure_profiles_page(page)
     control = page.locator(".react-select__control").first
@@ -879,6 +1767,7 @@ def clear_selected_team_via_cross(page: Page) -> None:
     clear_btn = control.locator(".react-select__clear-indicator").first
     if clear_btn.count() == 0:
         return
+    prev_sig = table_signature(page)
 
     try:
         clear_btn.click(force=True)
@@ -888,88 +1777,385 @@ def clear_selected_team_via_cross(page: Page) -> None:
         except Exception:
             pass
 
-    # Give the table a brief moment to refresh (XHR lists)
+    # Wait for the chips to go and the table to re-render (XHR lists)
     try:
-        page.wait_for_load_state("networkidle", timeout=5000)
+        expect(control.locator(".react-select__multi-value")).to_have_count(
+            0, timeout=3000
+        )
     except Exception:
-        page.wait_for_timeout(400)
-    reset_zoom(page)
+        pass
+    if not wait_for_table_refresh(page, prev_sig):
+        log("FILTER", "(warn) Table did not refresh after clearing the team.")
+
+
+# ===================== RESUME STATE =====================
+# Athletes captured successfully, keyed by team folder; re-runs skip them (delete to redo).
+# Lives in the output root, not the team folders, so cleanup can still prune empty teams.
+PROCESSED_FILE = ".processed.json"
+_processed_lock = threading.Lock()
+
+
+def _load_processed_state(state_file: Path) -> dict:
+    try:
+        return json.loads(state_file.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def load_processed_athletes(team_dir: Path) -> Set[str]:
+    """Folder names of athletes already captured in an earlier run of this team."""
+    state = _load_processed_state(team_dir.parent / PROCESSED_FILE)
+    return set(state.get(team_dir.name, []))
+
+
+def mark_athlete_processed(out_dir: Path) -> None:
+    """Add out_dir's athlete to its team's entry in PROCESSED_FILE (atomic, thread-safe)."""
+    team_dir = out_dir.parent
+    state_file = team_dir.parent / PROCESSED_FILE
+    with _processed_lock:
+        state = _load_processed_state(state_file)
+        done = set(state.get(team_dir.name, []))
+        done.add(out_dir.name)
+        state[team_dir.name] = sorted(done)
+        tmp = state_file.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, state_file)
+        except Exception as e:
+            log("STATE", f"(warn) Could not save progress for {out_dir.name}: {e}")
 
 
 # ===================== CLEANUP RUNNER =====================
+CLEANUP_SCRIPT = Path(__file__).with_name("cleanup_vald_images.py")
+CLEANUP_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cleanup")
+_cleanup_jobs: list = []  # Futures (in-process) or Popen handles (script fallback)
+
+
+def _settle_writes(pending_writes: list, athlete_dir: Path, mark_processed: bool) -> None:
+    """Wait for the athlete's PNGs; record it as processed only if every write landed."""
+    if wait_png_writes(pending_writes):
+        if mark_processed:
+            mark_athlete_processed(athlete_dir)
+    elif mark_processed:
+        log("STATE", f"'{athlete_dir.name}' has failed PNG writes; will retry next run.")
+
+
+def _cleanup_after_writes(
+    pending_writes: list, athlete_dir: Path, mark_processed: bool
+) -> None:
+    _settle_writes(pending_writes, athlete_dir, mark_processed)
+    cleanup_athlete_dir(athlete_dir)
+
+
+def start_athlete_cleanup(athlete_dir: Path, mark_processed: bool = False) -> None:
+    """
+    Clean one athlete folder in the background while the browser moves on.
+    Takes over this thread's pending PNG writes, so the cleanup only runs once the
+    athlete's files are on disk (capture itself never waits on the disk). With
+    `mark_processed`, the athlete goes into PROCESSED_FILE once all its writes landed.
+    """
+    pending_writes = take_png_writes()
+    if cleanup_athlete_dir is not None:
+        _cleanup_jobs.append(
+            CLEANUP_POOL.submit(
+                _cleanup_after_writes, pending_writes, athlete_dir, mark_processed
+            )
+        )
+        return
+    _settle_writes(pending_writes, athlete_dir, mark_processed)
+    if not CLEANUP_SCRIPT.exists():
+        return
+    try:
+        _cleanup_jobs.append(
+            subprocess.Popen(
+                [sys.executable, str(CLEANUP_SCRIPT), "--athlete", str(athlete_dir)],
+                cwd=str(CLEANUP_SCRIPT.parent),
+            )
+        )
+    except Exception as e:
+        log("CLEAN", f"Could not start cleanup for {athlete_dir.name}: {e}")
+
+
 def run_cleanup():
-    script_path = Path(__file__).with_name("cleanup_vald_images.py")
-    if not script_path.exists():
+    """Wait for the per-athlete cleanups started during the run."""
+    if cleanup_athlete_dir is None and not CLEANUP_SCRIPT.exists():
         log("CLEAN", "cleanup_vald_images.py not found; skipping.")
         return
+    if not _cleanup_jobs:
+        return
+    log("CLEAN", f"Waiting for {len(_cleanup_jobs)} athlete cleanup(s)...")
+    for job in _cleanup_jobs:
+        try:
+            if isinstance(job, subprocess.Popen):
+                job.wait()
+            else:
+                job.result()
+        except Exception as e:
+            log("CLEAN", f"Cleanup failed: {e}")
+    _cleanup_jobs.clear()
+    log("CLEAN", "Cleanup finished.")
+
+
+# ===================== BROWSER / PARALLEL CAPTURE =====================
+# Third-party analytics/tracking hosts aborted in every context (the scraper only needs chart DOM)
+BLOCK_DOMAINS = (
+    "doubleclick.net",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "newrelic.com",
+    "nr-data.net",
+    "datadoghq.com",
+    "sentry.io",
+    "fullstory.com",
+    "intercom.io",
+    "intercomcdn.com",
+    "clarity.ms",
+    "mixpanel.com",
+    "amplitude.com",
+)
+# VALD's own hosts (and their subdomains); everything else counts as foreign
+VALD_DOMAINS = (
+    "valdperformance.com",
+    "vald.com",
+    "valdhealth.com",
+)
+# Resource types never needed for chart screenshots, whoever serves them
+BLOCK_TYPES = {"media"}
+# Resource types aborted unless served by VALD itself (some charts use <img> sprites).
+# Fonts/stylesheets are kept on purpose: they change how charts render in the screenshots.
+BLOCK_FOREIGN_TYPES = {"image"}
+
+
+def _is_foreign_iframe(req) -> bool:
+    """
+    Third-party iframe documents (chat widgets, embeds) inside the logged-in app - never
+    part of a chart. Only pages under /app/ count: frames on the login flow (SSO, captcha)
+    must load or perform_login just times out.
+    """
     try:
-        log("CLEAN", f"Running {script_path.name}...")
-        subprocess.run(
-            [sys.executable, str(script_path)], cwd=str(script_path.parent), check=False
+        frame = req.frame
+        return (
+            req.resource_type == "document"
+            and frame.parent_frame is not None
+            and urlsplit(frame.page.url).path.startswith("/app/")
         )
-        log("CLEAN", "Cleanup finished.")
+    except Exception:
+        return False
+
+
+def _host_in(host: str, domains: Tuple[str, ...]) -> bool:
+    """True if host is one of `domains` or a subdomain of one (never a substring match)."""
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+def _route_filter(route) -> None:
+    req = route.request
+    url = req.url
+    if url.startswith("blob:"):
+        url = url[5:]  # blob:https://hub.valdperformance.com/<uuid> belongs to its origin
+    host = (urlsplit(url).hostname or "").lower()
+    foreign = not _host_in(host, VALD_DOMAINS)
+    if (
+        _host_in(host, BLOCK_DOMAINS)
+        or req.resource_type in BLOCK_TYPES
+        or (foreign and req.resource_type in BLOCK_FOREIGN_TYPES)
+        or (foreign and _is_foreign_iframe(req))
+    ):
+        route.abort()
+    else:
+        route.continue_()
+
+
+def _apply_storage_state(context, path: str) -> None:
+    """
+    Load cookies + localStorage from a storage_state JSON into a persistent context
+    (launch_persistent_context has no storage_state argument). AUTH_FILE is rewritten
+    after every login and at the end of every run, so its keys overwrite what a profile
+    kept from an earlier run (stale worker tokens would bounce to the login page). A
+    stamp of the file version makes that happen once per origin, so tokens the app
+    refreshes during the run are not rolled back on the next navigation.
+    """
+    try:
+        stamp = str(os.stat(path).st_mtime_ns)
+        state = json.loads(Path(path).read_text(encoding="utf-8"))
+    except Exception:
+        return
+    try:
+        if state.get("cookies"):
+            context.add_cookies(state["cookies"])
+        origins = {
+            o["origin"]: {i["name"]: i["value"] for i in o.get("localStorage", [])}
+            for o in state.get("origins", [])
+        }
+        if origins:
+            context.add_init_script(
+                script=f"""(() => {{
+                    const items = {json.dumps(origins)}[location.origin];
+                    if (!items || localStorage.getItem("__auth_state_stamp") === "{stamp}") return;
+                    for (const [k, v] of Object.entries(items))
+                        localStorage.setItem(k, v);
+                    localStorage.setItem("__auth_state_stamp", "{stamp}");
+                }})()"""
+            )
     except Exception as e:
-        log("CLEAN", f"Cleanup failed: {e}")
+        log("SESS", f"(warn) Could not apply {path}: {e}")
+
+
+def launch_capture_context(p, profile: str, storage_state: Optional[str] = None):
+    """
+    Launch Chromium on a persistent profile (PROFILE_DIR/<profile>, warm HTTP cache across
+    runs) as a capture-ready context (viewport, DPR, reduced motion, tracker blocking).
+    Returns (context, page). Each concurrently running browser needs its own `profile`.
+    """
+    context = p.chromium.launch_persistent_context(
+        user_data_dir=str(PROFILE_DIR / profile),
+        headless=HEADLESS,
+        slow_mo=SLOW_MO_MS,
+        args=CHROME_ARGS + [f"--disk-cache-size={DISK_CACHE_BYTES}"],
+        viewport={"width": WINDOW_W, "height": WINDOW_H},
+        device_scale_factor=DEVICE_SCALE,
+        reduced_motion="reduce",
+    )
+    if storage_state and os.path.exists(storage_state):
+        _apply_storage_state(context, storage_state)
+    context.set_default_timeout(DEFAULT_TIMEOUT)
+    context.set_default_navigation_timeout(NAV_TIMEOUT)
+    context.route("**/*", _route_filter)
+    page = context.pages[0] if context.pages else context.new_page()
+    page.set_viewport_size({"width": WINDOW_W, "height": WINDOW_H})
+    return context, page
+
+
+@contextmanager
+def _hires_viewport(page: Page):
+    """Full capture viewport for the duration of the block, then back to NAV_VIEWPORT."""
+    page.set_viewport_size({"width": WINDOW_W, "height": WINDOW_H})
+    try:
+        yield page
+    finally:
+        try:
+            page.set_viewport_size(NAV_VIEWPORT)
+        except Exception:
+            pass
+
+
+def capture_overview(
+    page: Page, overview_url: str, out_dir: Path, athlete_name: str, tag: str = ""
+) -> bool:
+    """
+    Open an athlete overview by URL in `page`, capture it and, when complete, record it
+    as processed once its PNGs are on disk. Errors are logged, not raised; returns True
+    for a complete capture.
+    """
+    prefix = f"[{tag}] " if tag else ""
+    ok = False
+    try:
+        page.goto(overview_url)
+        expect(page).to_have_url(_OVERVIEW_URL_RE, timeout=NAV_TIMEOUT)
+        saved, failed = take_screens_for_athlete(page, out_dir, athlete_name)
+        ok = capture_is_complete(saved, failed)
+        if not ok:
+            log("STATE", f"{prefix}'{athlete_name}' incomplete; will retry next run.")
+    except Exception as e:
+        log("ERROR", f"{prefix}While capturing '{athlete_name}': {e}")
+    start_athlete_cleanup(out_dir, mark_processed=ok)
+    return ok
+
+
+class CaptureWorkerPool:
+    """
+    Background threads that capture athlete overviews in parallel.
+    The sync Playwright API is bound to the thread that started it, so every worker
+    runs its own sync_playwright + persistent browser profile, seeded from AUTH_FILE
+    (no re-login). A worker whose session is rejected stops right away; jobs nobody
+    is left to take come back from close() for the caller to capture.
+    """
+
+    def __init__(self, workers: int):
+        self.jobs: "queue.Queue[Optional[Tuple[str, Path, str]]]" = queue.Queue()
+        self.alive = workers
+        self._alive_lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self._run, args=(i + 1,), daemon=True)
+            for i in range(workers)
+        ]
+        for t in self.threads:
+            t.start()
+
+    def submit(self, overview_url: str, out_dir: Path, athlete_name: str) -> bool:
+        """Queue a capture; False when every worker has stopped (capture it yourself)."""
+        if self.alive == 0:
+            return False
+        self.jobs.put((overview_url, out_dir, athlete_name))
+        return True
+
+    def close(self) -> List[Tuple[str, Path, str]]:
+        """Let workers drain the queue, stop them and return the jobs none of them took."""
+        for _ in self.threads:
+            self.jobs.put(None)
+        for t in self.threads:
+            t.join()
+        leftovers = []
+        while not self.jobs.empty():
+            job = self.jobs.get_nowait()
+            if job is not None:
+                leftovers.append(job)
+        return leftovers
+
+    def _run(self, worker_id: int) -> None:
+        tag = f"W{worker_id}"
+        try:
+            with sync_playwright() as p:
+                context, page = launch_capture_context(
+                    p, f"worker{worker_id}", storage_state=AUTH_FILE
+                )
+                try:
+                    # Logged out: one clear error, not a navigation timeout per athlete
+                    if not session_is_valid(page):
+                        log("ERROR", f"[{tag}] Saved session rejected; worker stopping.")
+                        return
+                    while True:
+                        job = self.jobs.get()
+                        if job is None:
+                            break
+                        capture_overview(page, *job, tag=tag)
+                finally:
+                    context.close()
+        except Exception as e:
+            log("ERROR", f"[{tag}] Capture worker stopped: {e}")
+        finally:
+            with self._alive_lock:
+                self.alive -= 1
 
 
 # ===================== MAIN =====================
 def main():
-    browser = None
     context = None
     page: Optional[Page] = None
+    detail_page: Optional[Page] = None  # serial mode: one reusable tab for athlete overviews
+    pool: Optional[CaptureWorkerPool] = None
 
     try:
         with sync_playwright() as p:
-            browser = p.chromium.launch(
-                headless=HEADLESS,
-                slow_mo=55 if not HEADLESS else 0,
-                args=CHROME_ARGS,
-            )
-
-            # ----- session -----
+            # ----- session (persistent profile keeps cookies; AUTH_FILE seeds/backs it up) -----
             if os.path.exists(AUTH_FILE):
                 log("SESS", "Loading saved auth state...")
-                context = browser.new_context(
-                    storage_state=AUTH_FILE,
-                    viewport={"width": WINDOW_W, "height": WINDOW_H},
-                    device_scale_factor=DEVICE_SCALE,
-                    reduced_motion="reduce",
-                )
-                page = context.new_page()
-                page.set_viewport_size({"width": WINDOW_W, "height": WINDOW_H})
-                page.goto(BASE_URL)
-                try:
-                    expect(page.locator('a[href="/app/profiles"]')).to_be_visible(
-                        timeout=15000
-                    )
-                    log("SESS", "Session OK.")
-                except Exception:
-                    log("SESS", "Session invalid. Re-authenticating...")
-                    context.close()
-                    os.remove(AUTH_FILE)
-                    context = browser.new_context(
-                        viewport={"width": WINDOW_W, "height": WINDOW_H},
-                        device_scale_factor=DEVICE_SCALE,
-                        reduced_motion="reduce",
-                    )
-                    page = context.new_page()
-                    page.set_viewport_size({"width": WINDOW_W, "height": WINDOW_H})
-                    if not perform_login(page):
-                        return
-                    context.storage_state(path=AUTH_FILE)
+            context, page = launch_capture_context(p, "main", storage_state=AUTH_FILE)
+            if session_is_valid(page):
+                log("SESS", "Session OK.")
             else:
-                context = browser.new_context(
-                    viewport={"width": WINDOW_W, "height": WINDOW_H},
-                    device_scale_factor=DEVICE_SCALE,
-                    reduced_motion="reduce",
-                )
-                page = context.new_page()
-                page.set_viewport_size({"width": WINDOW_W, "height": WINDOW_H})
+                log("SESS", "No valid session. Logging in...")
+                context.clear_cookies()
                 if not perform_login(page):
                     return
                 context.storage_state(path=AUTH_FILE)
 
             # ----- profiles page -----
+            # Tabs/workers keep the full capture viewport; the list page needs far fewer pixels
+            page.set_viewport_size(NAV_VIEWPORT)
             ensure_profiles_page(page)
 
             # ----- interactive team selection -----
@@ -986,75 +2172,127 @@ def main():
                 f"{('Prefix=' + values[0]) if mode=='prefix' else 'Explicit list'} -> {len(teams)} teams resolved.",
             )
 
+            # Overview captures run on worker contexts; this page only navigates the list
+            if CAPTURE_WORKERS > 1:
+                log("POOL", f"Starting {CAPTURE_WORKERS} capture workers.")
+                pool = CaptureWorkerPool(CAPTURE_WORKERS)
+
             # Process one team at a time into team folder
             for idx, team_name in enumerate(teams, start=1):
                 log("TEAM", f"[{idx}/{len(teams)}] {team_name}")
 
                 # ensure we're on the profiles list before switching teams
+                # (set_filter_to_single_team opens the dropdown itself)
                 ensure_profiles_page(page)
-                open_groups_dropdown(page)
-                set_filter_to_single_team(page, team_name)
+                try:
+                    set_filter_to_single_team(page, team_name)
+                except Exception as e:
+                    # Never scrape a table we can't prove belongs to this team
+                    log("ERROR", f"Could not filter to team '{team_name}': {e} Skipping it.")
+                    continue
 
                 # Team-level output directory
                 team_dir = OUTPUT_DIR / sanitize_filename(team_name)
                 team_dir.mkdir(parents=True, exist_ok=True)
 
                 # ----- table pagination for this team -----
-                processed_athletes = set()
+                # Resume: athletes finished in an earlier run are skipped
+                processed_athletes = load_processed_athletes(team_dir)
+                if processed_athletes:
+                    log(
+                        "STATE",
+                        f"{len(processed_athletes)} athlete(s) already captured for this team.",
+                    )
                 while True:
-                    rows = page.locator("tbody tr")
-                    nrows = rows.count()
-                    log("TABLE", f"{nrows} rows for team '{team_name}' on this page.")
-
-                    for i in range(nrows):
-                        row = rows.nth(i)
-                        try:
-                            profile_name = row.locator("td").nth(1).inner_text().strip()
-                        except Exception:
-                            continue
-
-                        # Skip obvious test rows with digits
-                        if re.search(r"\d", profile_name):
-                            log("TABLE", f"Skip test profile: {profile_name}")
-                            continue
-
-                        safe = sanitize_filename(profile_name)
-                        if safe in processed_athletes:
-                            log("TABLE", f"Skip already processed: {safe}")
-                            continue
+                    snapshot = snapshot_rows(page)  # names read once, not per row
+                    log(
+                        "TABLE",
+                        f"{len(snapshot)} rows for team '{team_name}' on this page.",
+                    )
 
+                    targets = pick_new_rows(snapshot, processed_athletes)
+                    last_safe = next(reversed(targets), None)
+                    prefetch: Optional[str] = None  # old table signature, once "next" was clicked early
+                    paged_early = False
+                    for safe, (i, cached) in targets.items():
+                        profile_name = cached["name"]
                         log("START", safe)
-                        out_dir = team_dir / safe
-                        out_dir.mkdir(parents=True, exist_ok=True)
+                        out_dir = team_dir / safe  # created by take_screens_for_athlete
+
+                        # Row links straight to the overview: capture in a separate tab
+                        # (or a worker) so the filtered list never reloads.
+                        overview_url = cached["href"]
+                        if overview_url:
+                            if pool is not None and pool.submit(
+                                overview_url, out_dir, profile_name
+                            ):
+                                processed_athletes.add(safe)
+                                continue
+                            if safe == last_safe:
+                                # Last athlete of this page: the list paginates while it's captured
+                                prefetch = click_next_page(page)
+                                paged_early = True
+                            log("NAV", "Opening athlete overview in the detail tab...")
+                            if detail_page is None or detail_page.is_closed():
+                                detail_page = page.context.new_page()
+                            if capture_overview(
+                                detail_page, overview_url, out_dir, profile_name
+                            ):
+                                processed_athletes.add(safe)
+                            continue
 
                         # open athlete overview
                         log("NAV", "Opening athlete overview...")
-                        row.locator('[aria-label="table-cell-initials"]').click()
+                        # Only rows without a link need a row locator (built on demand)
+                        page.locator("tbody tr").nth(i).locator(
+                            '[aria-label="table-cell-initials"]'
+                        ).click()
                         expect(page).to_have_url(
-                            re.compile(r".*/overview"), timeout=30000
+                            _OVERVIEW_URL_RE, timeout=NAV_TIMEOUT
                         )
-                        page.wait_for_timeout(400)
 
-                        try:
-                            take_screens_for_athlete(page, out_dir, profile_name)
+                        if pool is not None and pool.submit(
+                            page.url, out_dir, profile_name
+                        ):
                             processed_athletes.add(safe)
-                        except Exception as e:
-                            log("ERROR", f"While capturing '{safe}': {e}")
+                        else:
+                            complete = False
+                            try:
+                                with _hires_viewport(page):
+                                    saved, failed = take_screens_for_athlete(
+                                        page, out_dir, profile_name
+                                    )
+                                complete = capture_is_complete(saved, failed)
+                                if complete:
+                                    processed_athletes.add(safe)
+                                else:
+                                    log("STATE", f"'{safe}' incomplete; retry next run.")
+                            except Exception as e:
+                                log("ERROR", f"While capturing '{safe}': {e}")
+
+                            # tidy this athlete's folder while we move on to the next one
+                            # (recorded as processed once its PNGs are on disk)
+                            start_athlete_cleanup(out_dir, mark_processed=complete)
 
                         # back to list
                         log("NAV", "Back to profiles list...")
                         page.go_back()
                         ensure_profiles_page(page)
 
-                    # pagination
-                    next_btn = page.locator('button[aria-label="next page"]')
-                    if not next_btn.is_enabled():
+                    # pagination (possibly already started during the last capture)
+                    prev_sig = prefetch if paged_early else click_next_page(page)
+                    if prev_sig is None:
                         log("TABLE", f"Last page reached for team '{team_name}'.")
                         break
                     log("TABLE", "Next page...")
-                    next_btn.click()
-                    page.wait_for_load_state("networkidle")
-                    reset_zoom(page)
+                    if not wait_for_table_refresh(page, prev_sig):
+                        # Reading the old rows again would pass them off as the next page
+                        log(
+                            "TABLE",
+                            "(warn) Next page did not render in time; stopping this team "
+                            "here (the rest is picked up next run).",
+                        )
+                        break
 
                 log("TEAM", f"✅ Team complete: {team_name}")
 
@@ -1065,21 +2303,44 @@ def main():
                 except Exception as e:
                     log("FILTER", f"(warn) Could not clear via ×: {e}")
 
+            if pool is not None:
+                log("POOL", "Waiting for capture workers to finish...")
+                leftovers = pool.close()
+                pool = None
+                if leftovers:
+                    log(
+                        "POOL",
+                        f"{len(leftovers)} athlete(s) left by stopped workers; capturing here.",
+                    )
+                    if detail_page is None or detail_page.is_closed():
+                        detail_page = page.context.new_page()
+                    for job in leftovers:
+                        capture_overview(detail_page, *job)
+            if detail_page is not None and not detail_page.is_closed():
+                detail_page.close()
+
             log("DONE", "✅ All teams processed.")
 
+            # Persist refreshed cookies/tokens so the next run skips the login flow
+            try:
+                context.storage_state(path=AUTH_FILE)
+            except Exception:
+                pass
+
     except Exception as e:
         log("ERROR", f"Top-level error: {e}")
     finally:
         try:
-            if context:
-                context.close()
+            if pool is not None:
+                pool.close()
         except Exception:
             pass
         try:
-            if browser:
-                browser.close()
+            if context:
+                context.close()
         except Exception:
             pass
+        flush_png_writes()  # anything not handed to an athlete cleanup
         run_cleanup()
 
 